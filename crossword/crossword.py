@@ -3,6 +3,8 @@ class Variable():
     ACROSS = "across"
     DOWN = "down"
 
+    __slots__ = ("i", "j", "direction", "length", "cells", "id", "_hash")
+
     def __init__(self, i, j, direction, length):
         """Create a new variable with starting point, direction, and length."""
         self.i = i
@@ -15,9 +17,12 @@ class Variable():
                 (self.i + (k if self.direction == Variable.DOWN else 0),
                  self.j + (k if self.direction == Variable.ACROSS else 0))
             )
+        # Position in Crossword.variable_list, set by the crossword
+        self.id = None
+        self._hash = hash((self.i, self.j, self.direction, self.length))
 
     def __hash__(self):
-        return hash((self.i, self.j, self.direction, self.length))
+        return self._hash
 
     def __eq__(self, other):
         return (
@@ -35,6 +40,71 @@ class Variable():
         return f"Variable({self.i}, {self.j}, {direction}, {self.length})"
 
 
+class Vocabulary():
+    """
+    Words of a crossword as bitsets.
+
+    Words are numbered by length then alphabetically, and a set of words is
+    an int whose bit n is set if word n is in it. For every length, position
+    and letter, `index` holds the set of the words of that length with that
+    letter at that position, so filtering words by a letter is one AND.
+    """
+
+    # Vocabularies already built, by set of words, shared between crosswords
+    _built = {}
+
+    def __init__(self, words):
+        """Number the words and build the index."""
+        self.words = sorted(words, key=lambda word: (len(word), word))
+        self.ids = {word: n for n, word in enumerate(self.words)}
+        self.all = (1 << len(self.words)) - 1
+
+        # length -> set of the words of that length
+        self.lengths = {}
+        # (length, position, letter) -> set of the words with that letter there
+        self.index = {}
+        # (length, position) -> letters found there in some word
+        self.letters = {}
+        for n, word in enumerate(self.words):
+            bit = 1 << n
+            length = len(word)
+            self.lengths[length] = self.lengths.get(length, 0) | bit
+            for position, letter in enumerate(word):
+                key = (length, position, letter)
+                self.index[key] = self.index.get(key, 0) | bit
+                self.letters.setdefault((length, position), set()).add(letter)
+
+    @classmethod
+    def of(cls, words):
+        """Return the vocabulary of a set of words, building it only once."""
+        key = frozenset(words)
+        if key not in cls._built:
+            cls._built[key] = cls(key)
+        return cls._built[key]
+
+    def with_letter(self, length, position, letter):
+        """Return the set of the words of a length with a letter at a position."""
+        return self.index.get((length, position, letter), 0)
+
+    def decode(self, bits):
+        """Return the list of the words of a set."""
+        words = self.words
+        return [
+            words[n] for n, bit in enumerate(reversed(bin(bits)[2:]))
+            if bit == "1"
+        ]
+
+
+class Overlaps(dict):
+    """
+    Overlaps of pairs of variables, holding only the pairs that overlap:
+    any other pair reads as None.
+    """
+
+    def __missing__(self, key):
+        return None
+
+
 class Crossword():
 
     def __init__(self, structure_file, words_file):
@@ -60,6 +130,7 @@ class Crossword():
         # Save vocabulary list
         with open(words_file) as f:
             self.words = set(f.read().upper().splitlines())
+        self.vocabulary = Vocabulary.of(self.words)
 
         # Determine variable set
         self.variables = set()
@@ -104,30 +175,36 @@ class Crossword():
                             length=length
                         ))
 
+        # Number variables, top to bottom then left to right
+        self.variable_list = sorted(
+            self.variables, key=lambda v: (v.i, v.j, v.direction)
+        )
+        for n, v in enumerate(self.variable_list):
+            v.id = n
+
         # Compute overlaps for each word
         # For any pair of variables v1, v2, their overlap is either:
         #    None, if the two variables do not overlap; or
         #    (i, j), where v1's ith character overlaps v2's jth character
-        self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (
-                        cells1.index(intersection),
-                        cells2.index(intersection)
-                    )
+        # A cell is in at most one across and one down word, so walking the
+        # cells of every word finds all the pairs that overlap
+        self.overlaps = Overlaps()
+        words_at = dict()
+        for v in self.variable_list:
+            for k, cell in enumerate(v.cells):
+                words_at.setdefault(cell, []).append((v, k))
+        for here in words_at.values():
+            if len(here) == 2:
+                (v1, k1), (v2, k2) = here
+                self.overlaps[v1, v2] = (k1, k2)
+                self.overlaps[v2, v1] = (k2, k1)
+
+        # Overlapping variables of each variable, by id
+        self.adjacency = [set() for _ in self.variable_list]
+        for v1, v2 in self.overlaps:
+            self.adjacency[v1.id].add(v2)
+        self.adjacency = [frozenset(neighbors) for neighbors in self.adjacency]
 
     def neighbors(self, var):
         """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
-        )
+        return self.adjacency[var.id]
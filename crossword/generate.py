@@ -9,11 +9,25 @@ class CrosswordCreator():
         Create new CSP crossword generate.
         """
         self.crossword = crossword
+        self.vocabulary = crossword.vocabulary
+
+        # Domains are sets of words as bitsets (see Vocabulary)
         self.domains = {
-            var: self.crossword.words.copy()
+            var: self.vocabulary.all
             for var in self.crossword.variables
         }
 
+        # Levels of the search whose assignments a domain follows from, as
+        # a bitset over depths (bit d for the variable assigned at depth d)
+        self.reasons = {var: 0 for var in self.crossword.variables}
+
+        # (variable, domain, reasons) before each reduction of a domain,
+        # so that the search undoes its reductions instead of copying
+        self.trail = []
+
+        # Variable whose domain the last failed ac3 emptied
+        self.wiped_out = None
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -99,10 +113,7 @@ class CrosswordCreator():
          constraints; in this case, the length of the word.)
         """
         for v in self.domains:
-            tmp = self.domains[v].copy()
-            for x in tmp:
-                if len(x) != v.length :
-                    self.domains[v].remove(x)
+            self.domains[v] &= self.vocabulary.lengths.get(v.length, 0)
 
     def revise(self, x, y):
         """
@@ -112,23 +123,48 @@ class CrosswordCreator():
 
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
+
+        The words of `x` kept are the ones whose letter at the overlap is
+        the letter of some word of `y` there: a union over letters of the
+        positional index.
         """
-        changed = False
         overlap = self.crossword.overlaps[(x,y)]
+        if not overlap:
+            return False
+
+        i, j = overlap
+        vocabulary = self.vocabulary
+        words_y = self.domains[y]
+        allowed = 0
+        for letter in vocabulary.letters.get((y.length, j), ()):
+            if words_y & vocabulary.with_letter(y.length, j, letter):
+                allowed |= vocabulary.with_letter(x.length, i, letter)
+
+        words_x = self.domains[x] & allowed
+        if words_x == self.domains[x]:
+            return False
+        self.reduce(x, words_x, self.reasons[y])
+        return True
 
-        if overlap:
-            words_x = self.domains[x].copy()
-            for word_x in words_x:
-                remove = True
-                for word_y in self.domains[y]:
-                    if word_x[overlap[0]] == word_y[overlap[1]]:
-                        remove = False
-                        break
-                if remove:
-                    self.domains[x].remove(word_x)
-                    changed = True
+    def reduce(self, var, words, reasons):
+        """
+        Set the domain of `var` to `words`, recording the previous one on
+        the trail. `reasons` are the levels of the search the reduction
+        follows from.
+        """
+        self.trail.append((var, self.domains[var], self.reasons[var]))
+        self.domains[var] = words
+        self.reasons[var] |= reasons
 
-        return changed
+    def undo(self, mark):
+        """
+        Undo the reductions of domains made since the trail had `mark` entries.
+        """
+        trail = self.trail
+        while len(trail) > mark:
+            var, words, reasons = trail.pop()
+            self.domains[var] = words
+            self.reasons[var] = reasons
 
     def ac3(self, arcs=None):
         """
@@ -139,13 +175,16 @@ class CrosswordCreator():
         Return True if arc consistency is enforced and no domains are empty;
         return False if one or more domains end up empty.
         """
-        if not arcs:
-            queue = list(self.crossword.overlaps.keys())
+        if arcs is None:
+            queue = [arc for arc, overlap in self.crossword.overlaps.items() if overlap]
+        else:
+            queue = list(arcs)
 
         while queue:
             (x,y) = queue.pop()
             if self.revise(x,y):
-                if len(self.domains[x]) == 0:
+                if not self.domains[x]:
+                    self.wiped_out = x
                     return False
                 for z in self.crossword.neighbors(x):
                     if z != y:
@@ -176,7 +215,7 @@ class CrosswordCreator():
                 return False
             # check for length of word
             if len(assignment[variable]) != variable.length:
-                return false
+                return False
             # for the current variable, check if for an overlap, if the value is filled, the cell is ok
             neighbors = self.crossword.neighbors(variable)
             for variable2 in neighbors:
@@ -194,13 +233,15 @@ class CrosswordCreator():
 
     def number_ruled_out(self, assignment, var, word):
             neighbors = self.crossword.neighbors(var)
-            not_assigned_neighbors = list(set(neighbors) - set(assignment.keys()))
+            not_assigned_neighbors = neighbors - assignment.keys()
 
+            # words of each neighbor without the letter of `word` at the overlap
             n = 0
             for var2 in not_assigned_neighbors:
-                for word2 in self.domains[var2]:
-                    if self.inconsistency(var, var2, word, word2):
-                         n = n + 1
+                i, j = self.crossword.overlaps[(var, var2)]
+                words2 = self.domains[var2]
+                kept = words2 & self.vocabulary.with_letter(var2.length, j, word[i])
+                n = n + words2.bit_count() - kept.bit_count()
             return n
     
     def order_domain_values(self, var, assignment):
@@ -211,7 +252,7 @@ class CrosswordCreator():
         that rules out the fewest values among the neighbors of `var`.
         """
 
-        tmp = list(self.domains[var].copy())
+        tmp = self.vocabulary.decode(self.domains[var])
         return sorted(tmp, key=lambda x: self.number_ruled_out(assignment, var, x))
 
     def select_unassigned_variable(self, assignment):
@@ -223,29 +264,65 @@ class CrosswordCreator():
         return values.
         """
         variables = list(set(self.domains.keys()) - set(assignment.keys()))
-        sorted(variables, key=lambda x: (len(self.domains[x]), len(self.crossword.neighbors(x))))
-        return variables[0]
+        return min(variables, key=lambda x: (self.domains[x].bit_count(), -len(self.crossword.neighbors(x))))
 
-    def recursive_backtrack(self, assignment, solution):
+    def assign(self, var, word, level):
+        """
+        Assign `word` to `var` and maintain arc consistency: the word is
+        removed from the other domains, then the neighbors of `var` are
+        revised, and so on. `level` is the bit of the depth of the search
+        the assignment is made at.
 
-        if not self.consistent(assignment):
-            return None
-        if self.assignment_complete(assignment):
-            solution.append(assignment)
-            return assignment
+        Return None if no domain ends up empty; otherwise return the levels
+        of the search the empty domain follows from.
+        """
+        bit = 1 << self.vocabulary.ids[word]
+        self.reduce(var, bit, level)
 
-        else:
-            var = self.select_unassigned_variable(assignment)
-            word_list = self.order_domain_values(var, assignment)
-            for word in word_list:
-                temp = assignment.copy()
-                if word not in assignment.values():
-                    temp[var] = word
-                    self.recursive_backtrack(temp, solution)
-                    if solution:
-                        return solution[0]
+        # the same word can not be used twice
+        for other in self.crossword.variables:
+            if other != var and other.length == var.length and self.domains[other] & bit:
+                self.reduce(other, self.domains[other] & ~bit, level)
+                if not self.domains[other]:
+                    return self.reasons[other]
+
+        if not self.ac3((z, var) for z in self.crossword.neighbors(var)):
+            return self.reasons[self.wiped_out]
+        return None
+
+    def recursive_backtrack(self, assignment, depth):
+        """
+        Extend `assignment`, made of the assignments of the first `depth`
+        levels of the search, to a complete assignment.
+
+        Return (solution, None) if one is found; otherwise return
+        (None, conflict), conflict being the levels of the search whose
+        assignments leave no solution. The search then jumps back to the
+        deepest of them, skipping the levels in between: their assignments
+        are not part of the conflict.
+        """
+        if self.assignment_complete(assignment):
+            return dict(assignment), None
+
+        var = self.select_unassigned_variable(assignment)
+        level = 1 << depth
+        # values not in the domain were ruled out by earlier levels
+        conflict = self.reasons[var]
+        for word in self.order_domain_values(var, assignment):
+            mark = len(self.trail)
+            assignment[var] = word
+            failure = self.assign(var, word, level)
+            if failure is None:
+                solution, failure = self.recursive_backtrack(assignment, depth + 1)
+                if solution is not None:
+                    return solution, None
+            del assignment[var]
+            self.undo(mark)
+            if not failure & level:
+                return None, failure
+            conflict |= failure & ~level
+        return None, conflict
 
-    
     def backtrack(self, assignment):
         """
         Using Backtracking Search, take as input a partial assignment for the
@@ -255,8 +332,14 @@ class CrosswordCreator():
 
         If no assignment is possible, return None.
         """
-        temp = list()
-        return self.recursive_backtrack(assignment, temp)
+        mark = len(self.trail)
+        assignment = dict(assignment)
+        solution = None
+        # the given words are part of the problem, not of the search
+        if all(self.assign(var, word, 0) is None for var, word in assignment.items()):
+            solution, _ = self.recursive_backtrack(assignment, 0)
+        self.undo(mark)
+        return solution
 
 
 def main():
@@ -0,0 +1,71 @@
+"""
+Benchmarks of the Minesweeper AI
+
+Usage: python bench.py [inference]
+"""
+
+import random
+import sys
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+def play(height, width, mines, seed, **options):
+    """
+    Plays one seeded game with the AI revealing whole regions. Returns
+    (won, cells inferred, seconds spent in add_knowledge_batch).
+    """
+    random.seed(seed)
+    game = Minesweeper(height, width, mines, seed=seed)
+    ai = MinesweeperAI(height, width, mines=mines, **options)
+    inferred = 0
+    spent = 0.0
+    while len(ai.moves_made) < height * width - mines:
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        if game.is_mine(move):
+            return False, inferred, spent
+        cells = game.reveal(move)
+        known = len(ai.mines) + len(ai.safes | cells.keys())
+        start = time.perf_counter()
+        ai.add_knowledge_batch(cells)
+        spent += time.perf_counter() - start
+        inferred += len(ai.mines) + len(ai.safes) - known
+    return True, inferred, spent
+
+
+def bench_inference(configurations=((8, 8, 8, 200), (16, 16, 40, 100), (16, 30, 99, 50))):
+    """
+    Prints the win rate and deductions per second of each inference.
+    """
+    for height, width, mines, games in configurations:
+        for inference in MinesweeperAI.INFERENCES:
+            wins = inferred = 0
+            spent = 0.0
+            for seed in range(games):
+                won, cells, seconds = play(height, width, mines, seed, inference=inference)
+                wins += won
+                inferred += cells
+                spent += seconds
+            print(f"{height}x{width}/{mines} {inference:7s} win rate {wins / games:6.1%}  "
+                  f"{inferred} cells inferred, {inferred / spent:9.0f} per second")
+
+
+BENCHMARKS = {
+    "inference": bench_inference,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            sys.exit(f"Unknown benchmark: {name}")
+        print(f"== {name}")
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
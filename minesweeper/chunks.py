@@ -0,0 +1,176 @@
+"""
+Minesweeper on a board with no end
+
+The board is cut in square chunks. The mines of a chunk are drawn the first
+time one of its cells is used, from the seed of the game and the position
+of the chunk, so a chunk dropped from memory is drawn the same again. Only
+the chunks touched so far are kept: beyond `max_chunks`, the least recently
+used chunks whose safe cells are all revealed (solved) are dropped, and
+only their position is remembered.
+
+Rows and columns are any integers, negative ones included.
+"""
+
+import random
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from minesweeper import neighbor_counts
+
+
+class Chunk():
+    """
+    Mines, counts of nearby mines and revealed cells of one chunk.
+    """
+
+    __slots__ = ("mines", "counts", "revealed", "hidden")
+
+    def __init__(self, mines, counts, solved=False):
+        self.mines = mines
+        self.counts = counts
+        if solved:
+            self.revealed = ~mines
+            self.hidden = 0
+        else:
+            self.revealed = np.zeros(mines.shape, dtype=bool)
+            # safe cells not revealed yet
+            self.hidden = mines.size - int(mines.sum())
+
+
+class ChunkedMinesweeper():
+    """
+    Minesweeper game representation on a board with no end, where each
+    cell is a mine with probability `density`
+    """
+
+    def __init__(self, density=0.15, seed=None, chunk_size=64, max_chunks=1024, reveal_limit=100000):
+        self.density = density
+        # (seeded from `random` by default, so random.seed still applies)
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        # most cells revealed at once: regions without nearby mines can
+        # be as big as the board when the density is low
+        self.reveal_limit = reveal_limit
+
+        # position -> Chunk, for the chunks in memory
+        self.chunks = {}
+
+        # positions of the solved chunks in memory, least recently used
+        # first, and of the ones dropped
+        self.solved = OrderedDict()
+        self.dropped = set()
+
+        # At first, player has found no mines
+        self.mines_found = set()
+
+    def _draw(self, position):
+        """
+        Returns the mines of the chunk at a position, drawn from the seed.
+        """
+        # seed sequences only take natural numbers: map n to 2n or -2n-1
+        entropy = [self.seed] + [2 * n if n >= 0 else -2 * n - 1 for n in position]
+        rng = np.random.default_rng(entropy)
+        return rng.random((self.chunk_size, self.chunk_size)) < self.density
+
+    def _mines(self, position):
+        chunk = self.chunks.get(position)
+        if chunk is not None:
+            return chunk.mines
+        return self._draw(position)
+
+    def _chunk(self, position):
+        """
+        Returns the chunk at a position, drawing it if it is not in memory.
+        """
+        chunk = self.chunks.get(position)
+        if chunk is not None:
+            if position in self.solved:
+                self.solved.move_to_end(position)
+            return chunk
+
+        size = self.chunk_size
+        mines = self._draw(position)
+
+        # the counts on the edges need the mines on the edges of the
+        # chunks around
+        padded = np.zeros((size + 2, size + 2), dtype=bool)
+        padded[1:-1, 1:-1] = mines
+        # for an offset of -1, 0 or 1: (rows of padded, rows of the neighbor)
+        parts = {
+            -1: (slice(0, 1), slice(size - 1, size)),
+            0: (slice(1, size + 1), slice(0, size)),
+            1: (slice(size + 1, size + 2), slice(0, 1)),
+        }
+        ci, cj = position
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                if di or dj:
+                    other = self._mines((ci + di, cj + dj))
+                    padded[parts[di][0], parts[dj][0]] = other[parts[di][1], parts[dj][1]]
+
+        solved = position in self.dropped
+        self.dropped.discard(position)
+        chunk = self.chunks[position] = Chunk(mines, neighbor_counts(padded), solved)
+        if solved:
+            self.solved[position] = None
+        self._evict()
+        return chunk
+
+    def _evict(self):
+        while len(self.chunks) > self.max_chunks and self.solved:
+            position, _ = self.solved.popitem(last=False)
+            del self.chunks[position]
+            self.dropped.add(position)
+
+    def _locate(self, cell):
+        """
+        Returns the chunk of a cell, and the row and column of the cell in it.
+        """
+        ci, i = divmod(cell[0], self.chunk_size)
+        cj, j = divmod(cell[1], self.chunk_size)
+        return self._chunk((ci, cj)), i, j
+
+    def is_mine(self, cell):
+        chunk, i, j = self._locate(cell)
+        return bool(chunk.mines[i, j])
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        chunk, i, j = self._locate(cell)
+        return int(chunk.counts[i, j])
+
+    def reveal(self, cell):
+        """
+        Reveals a cell that is not a mine. If no mine is around it, its
+        neighbors are revealed too, and so on across the region of cells
+        without nearby mines, up to reveal_limit cells.
+
+        Returns a dictionary of the newly revealed cells and their count
+        of nearby mines.
+        """
+        if self.is_mine(cell):
+            raise ValueError(f"{cell} is a mine")
+        revealed = {}
+        queue = deque([cell])
+        while queue and len(revealed) < self.reveal_limit:
+            cell = queue.popleft()
+            chunk, i, j = self._locate(cell)
+            if chunk.revealed[i, j]:
+                continue
+            chunk.revealed[i, j] = True
+            chunk.hidden -= 1
+            if chunk.hidden == 0:
+                self.solved[(cell[0] // self.chunk_size, cell[1] // self.chunk_size)] = None
+            count = int(chunk.counts[i, j])
+            revealed[cell] = count
+            if count == 0:
+                for a in range(cell[0] - 1, cell[0] + 2):
+                    for b in range(cell[1] - 1, cell[1] + 2):
+                        queue.append((a, b))
+        return revealed
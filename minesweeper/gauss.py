@@ -0,0 +1,89 @@
+"""
+Linear algebra inference for Minesweeper
+
+Each sentence is the equation "sum of its cells = count", with one 0/1
+unknown per cell. Gaussian elimination over the integers combines any
+number of sentences at once. On a reduced row, if the count is the
+largest value the left side can take, every cell with a positive
+coefficient is a mine and every cell with a negative one is safe (and
+the opposite if it is the smallest value).
+"""
+
+from math import gcd
+
+
+def _eliminate(row, column, pivot_row):
+    """
+    Returns row with column removed using pivot_row, whose own coefficient
+    of column is not zero.
+    """
+    coefficients, constant = row
+    a = coefficients.get(column)
+    if a is None:
+        return row
+    pivot_coefficients, pivot_constant = pivot_row
+    p = pivot_coefficients[column]
+
+    res = {cell: c * p for cell, c in coefficients.items()}
+    for cell, c in pivot_coefficients.items():
+        value = res.get(cell, 0) - c * a
+        if value:
+            res[cell] = value
+        else:
+            res.pop(cell, None)
+    constant = constant * p - pivot_constant * a
+
+    # keep the numbers small
+    divisor = abs(constant)
+    for c in res.values():
+        divisor = gcd(divisor, c)
+    if divisor > 1:
+        res = {cell: c // divisor for cell, c in res.items()}
+        constant //= divisor
+    return (res, constant)
+
+
+def reduce(rows):
+    """
+    Returns the reduced rows of a system of (coefficients, constant)
+    equations, coefficients being a dictionary from cell to integer.
+    Every pivot cell only appears in its own row.
+    """
+    pivots = []
+    for row in rows:
+        for column, pivot_row in pivots:
+            row = _eliminate(row, column, pivot_row)
+        if not row[0]:
+            continue
+        column = min(row[0])
+        pivots = [(c, _eliminate(r, column, row)) for c, r in pivots]
+        pivots.append((column, row))
+    return [row for _, row in pivots]
+
+
+def forced(rows):
+    """
+    Returns the (mines, safes) sets of cells decided by the bounds of
+    each row.
+    """
+    mines = set()
+    safes = set()
+    for coefficients, constant in rows:
+        highest = sum(c for c in coefficients.values() if c > 0)
+        lowest = sum(c for c in coefficients.values() if c < 0)
+        if constant == highest:
+            mines.update(cell for cell, c in coefficients.items() if c > 0)
+            safes.update(cell for cell, c in coefficients.items() if c < 0)
+        elif constant == lowest:
+            safes.update(cell for cell, c in coefficients.items() if c > 0)
+            mines.update(cell for cell, c in coefficients.items() if c < 0)
+    return mines, safes
+
+
+def infer(sentences):
+    """
+    Returns the (mines, safes) sets of cells that follow from the
+    (cells, count) sentences.
+    """
+    rows = [({cell: 1 for cell in cells}, count) for cells, count in sentences if cells]
+    return forced(reduce(rows))
@@ -1,5 +1,26 @@
 import itertools
+import json
 import random
+import time
+from array import array
+from collections import deque
+
+import numpy as np
+
+import gauss
+from probability import ProbabilitySolver
+
+
+def neighbor_counts(padded):
+    """
+    Returns the number of mines around each cell of a board, given the
+    board with a border of one cell on every side: the padded board is
+    convolved with a 3x3 box (done as a sum over 3 columns then over 3
+    rows), minus the cell itself.
+    """
+    padded = padded.astype(np.uint8)
+    columns = padded[:, :-2] + padded[:, 1:-1] + padded[:, 2:]
+    return columns[:-2] + columns[1:-1] + columns[2:] - padded[1:-1, 1:-1]
 
 
 class Minesweeper():
@@ -7,32 +28,53 @@ class Minesweeper():
     Minesweeper game representation
     """
 
-    def __init__(self, height=8, width=8, mines=8):
+    def __init__(self, height=8, width=8, mines=8, seed=None):
 
-        # Set initial width, height, and number of mines
-        self.height = height
-        self.width = width
-        self.mines = set()
+        # Add mines randomly, drawing all their positions at once
+        # (seeded from `random` by default, so random.seed still applies)
+        if seed is None:
+            seed = random.getrandbits(64)
+        rng = np.random.default_rng(seed)
+        positions = rng.choice(height * width, size=mines, replace=False)
+        board = np.zeros((height, width), dtype=bool)
+        board.flat[positions] = True
+        self._set_board(board)
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+    @classmethod
+    def from_board(cls, board):
+        """
+        Returns a game whose mines are the True cells of a 2D array.
+        """
+        game = cls.__new__(cls)
+        game._set_board(np.array(board, dtype=bool))
+        return game
+
+    def _set_board(self, board):
 
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Set initial width, height, and mines
+        self.height, self.width = board.shape
+        self.board = board
+        self._mines = None
+
+        # Number of mines around each cell, no mine being outside the board
+        self.counts = neighbor_counts(np.pad(self.board, 1))
+
+        # Cells already revealed by reveal()
+        self.revealed = np.zeros(board.shape, dtype=bool)
 
         # At first, player has found no mines
         self.mines_found = set()
 
+    @property
+    def mines(self):
+        """
+        Set of the cells (i, j) that are mines, built on first use.
+        """
+        if self._mines is None:
+            rows, columns = np.nonzero(self.board)
+            self._mines = set(zip(rows.tolist(), columns.tolist()))
+        return self._mines
+
     def print(self):
         """
         Prints a text-based representation
@@ -50,7 +92,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i, j])
 
     def nearby_mines(self, cell):
         """
@@ -58,24 +100,35 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
+        i, j = cell
+        return int(self.counts[i, j])
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
+    def reveal(self, cell):
+        """
+        Reveals a cell that is not a mine. If no mine is around it, its
+        neighbors are revealed too, and so on across the whole region of
+        cells without nearby mines.
 
-        return count
+        Returns a dictionary of the newly revealed cells and their count
+        of nearby mines.
+        """
+        if self.is_mine(cell):
+            raise ValueError(f"{cell} is a mine")
+        revealed = {}
+        queue = deque([cell])
+        while queue:
+            i, j = queue.popleft()
+            if self.revealed[i, j]:
+                continue
+            self.revealed[i, j] = True
+            count = int(self.counts[i, j])
+            revealed[(i, j)] = count
+            if count == 0:
+                for a in range(max(0, i - 1), min(self.height, i + 2)):
+                    for b in range(max(0, j - 1), min(self.width, j + 2)):
+                        if not self.revealed[a, b]:
+                            queue.append((a, b))
+        return revealed
 
     def won(self):
         """
@@ -135,16 +188,415 @@ class Sentence():
             self.cells.remove(cell)
 
 
+class CompactSentence():
+    """
+    Sentence with its cells as the bits of a small integer: bit
+    r * STRIDE + c stands for cell (row + r, col + c), (row, col) being
+    the lowest row and column of the cells. Subset tests and differences
+    are bit operations, and checking if a sentence is decisive allocates
+    nothing.
+
+    The cells of a sentence must be less than STRIDE // 2 columns apart,
+    which the neighbors of a cell (and their subsets) always are.
+    """
+
+    STRIDE = 8
+
+    __slots__ = ("row", "col", "mask", "count", "size")
+
+    # mask -> ((r, c) of its bits, (rows, columns, mask) to normalize it),
+    # shared by every sentence: there are few distinct masks
+    _layouts = {}
+
+    def __init__(self, row, col, mask, count):
+        self.row = row
+        self.col = col
+        self.mask = mask
+        self.count = count
+        self.size = mask.bit_count()
+        self._normalize()
+
+    @classmethod
+    def from_cells(cls, cells, count):
+        """
+        Returns the sentence saying that `count` of the cells are mines.
+        """
+        cells = list(cells)
+        if not cells:
+            return cls(0, 0, 0, count)
+        row = min(i for i, _ in cells)
+        col = min(j for _, j in cells)
+        mask = 0
+        for i, j in cells:
+            if j - col >= cls.STRIDE // 2:
+                raise ValueError(f"Cells too far apart for a CompactSentence: {cells}")
+            mask |= 1 << ((i - row) * cls.STRIDE + j - col)
+        return cls(row, col, mask, count)
+
+    @classmethod
+    def _layout(cls, mask):
+        layout = cls._layouts.get(mask)
+        if layout is None:
+            offsets = tuple(
+                divmod(bit, cls.STRIDE) for bit in range(mask.bit_length()) if mask >> bit & 1
+            )
+            rows = min((r for r, _ in offsets), default=0)
+            columns = min((c for _, c in offsets), default=0)
+            layout = cls._layouts[mask] = (
+                offsets, (rows, columns, mask >> (rows * cls.STRIDE + columns))
+            )
+        return layout
+
+    def _normalize(self):
+        # move (row, col) to the lowest row and column of the cells
+        rows, columns, self.mask = self._layout(self.mask)[1]
+        self.row += rows
+        self.col += columns
+
+    def __iter__(self):
+        row = self.row
+        col = self.col
+        return iter([(row + r, col + c) for r, c in self._layout(self.mask)[0]])
+
+    def __str__(self):
+        return f"{self.cells()} = {self.count}"
+
+    def cells(self):
+        """
+        Returns the set of cells of the sentence.
+        """
+        return set(self)
+
+    def key(self):
+        return (self.row, self.col, self.mask, self.count)
+
+    def decisive(self):
+        """
+        Returns True if the cells are all mines, or all safe.
+        """
+        return self.count == 0 or self.count == self.size
+
+    def is_proper_subset(self, other):
+        """
+        Returns True if the cells are a proper subset of the cells of other.
+        """
+        row = self.row - other.row
+        col = self.col - other.col
+        if self.size >= other.size or row < 0 or not 0 <= col < self.STRIDE // 2:
+            return False
+        mask = self.mask << (row * self.STRIDE + col)
+        return mask & other.mask == mask
+
+    def difference(self, other):
+        """
+        Returns the sentence about the cells not in other, other being
+        a subset of self.
+        """
+        mask = self.mask & ~(other.mask << ((other.row - self.row) * self.STRIDE + other.col - self.col))
+        return CompactSentence(self.row, self.col, mask, self.count - other.count)
+
+    def remove(self, cell, mine):
+        """
+        Removes a cell known to be a mine or safe, if it is in the sentence.
+        """
+        row = cell[0] - self.row
+        col = cell[1] - self.col
+        if row < 0 or not 0 <= col < self.STRIDE:
+            return
+        bit = 1 << (row * self.STRIDE + col)
+        if not self.mask & bit:
+            return
+        self.mask ^= bit
+        self.size -= 1
+        if mine:
+            self.count -= 1
+        if row == 0 or col == 0:
+            self._normalize()
+
+
+class KnowledgeBase():
+    """
+    Sentences known by the AI, indexed by the cells they contain.
+
+    Sentences are stored as CompactSentence. Marking a cell only updates
+    the sentences containing it, and sentences that become decisive (all
+    their cells are mines, or all are safe) are put on a work queue instead
+    of being searched for. Sentences are also indexed by their fields, so
+    a sentence is never stored twice.
+    """
+
+    def __init__(self):
+        self.sentences = {}
+        self.next_id = 0
+
+        # cell -> ids of the sentences containing it
+        self.index = {}
+
+        # sentence key -> id of the sentence
+        self.keys = {}
+
+        # ids of sentences that may be decisive
+        self.queue = deque()
+
+        # ids of sentences added or changed since the last inference
+        self.dirty = set()
+
+    def __iter__(self):
+        return iter(list(self.sentences.values()))
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __contains__(self, sentence):
+        return sentence.key() in self.keys
+
+    def overlapping(self, sentence):
+        """
+        Returns the sentences sharing at least one cell with a sentence,
+        itself included if it is stored.
+        """
+        ids = set()
+        for cell in sentence:
+            ids.update(self.index.get(cell, ()))
+        return [self.sentences[i] for i in ids]
+
+    def add(self, sentence):
+        """
+        Adds a sentence, unless it is empty or already known.
+        Returns True if it was added.
+        """
+        if not sentence.mask:
+            return False
+        key = sentence.key()
+        if key in self.keys:
+            return False
+        sentence_id = self.next_id
+        self.next_id += 1
+        self.sentences[sentence_id] = sentence
+        self.keys[key] = sentence_id
+        for cell in sentence:
+            self.index.setdefault(cell, set()).add(sentence_id)
+        self._changed(sentence_id, sentence)
+        return True
+
+    def _remove(self, sentence_id):
+        sentence = self.sentences.pop(sentence_id)
+        for cell in sentence:
+            self.index[cell].discard(sentence_id)
+        self.dirty.discard(sentence_id)
+
+    def _changed(self, sentence_id, sentence):
+        self.dirty.add(sentence_id)
+        if sentence.decisive():
+            self.queue.append(sentence_id)
+
+    def _update(self, cell, mine):
+        for sentence_id in self.index.pop(cell, ()):
+            sentence = self.sentences[sentence_id]
+            del self.keys[sentence.key()]
+            sentence.remove(cell, mine)
+
+            key = sentence.key()
+            if not sentence.mask or key in self.keys:
+                self._remove(sentence_id)
+            else:
+                self.keys[key] = sentence_id
+                self._changed(sentence_id, sentence)
+
+    def mark_mine(self, cell):
+        """
+        Updates the sentences containing a cell known to be a mine.
+        """
+        self._update(cell, True)
+
+    def mark_safe(self, cell):
+        """
+        Updates the sentences containing a cell known to be safe.
+        """
+        self._update(cell, False)
+
+    def pop_decisive(self):
+        """
+        Returns a sentence whose cells are all mines or all safe,
+        or None if there is none left.
+        """
+        while self.queue:
+            sentence = self.sentences.get(self.queue.popleft())
+            if sentence is not None and sentence.decisive():
+                return sentence
+        return None
+
+    def connected(self, sentences):
+        """
+        Returns the sentences linked to the given ones by chains of
+        sentences sharing a cell, the given ones included.
+        """
+        ids = set()
+        seen = set()
+        cells = deque(cell for sentence in sentences for cell in sentence)
+        while cells:
+            cell = cells.popleft()
+            if cell in seen:
+                continue
+            seen.add(cell)
+            for sentence_id in self.index.get(cell, ()):
+                if sentence_id not in ids:
+                    ids.add(sentence_id)
+                    cells.extend(self.sentences[sentence_id])
+        return [self.sentences[i] for i in ids]
+
+    def pop_dirty(self):
+        """
+        Returns the sentences added or changed since the last call.
+        """
+        sentences = [self.sentences[i] for i in self.dirty]
+        self.dirty = set()
+        return sentences
+
+
+class CellView():
+    """
+    Read-only sequence of the cells of a list of ids i * width + j.
+    """
+
+    __slots__ = ("ids", "width")
+
+    def __init__(self, ids, width):
+        self.ids = ids
+        self.width = width
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, n):
+        return divmod(self.ids[n], self.width)
+
+
+class CellSet():
+    """
+    Set of cells that can also be indexed, to pick a random one in
+    constant time. Removing a cell moves the last one in its place.
+    """
+
+    __slots__ = ("cells", "positions")
+
+    def __init__(self):
+        self.cells = []
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        return cell in self.positions
+
+    def __getitem__(self, n):
+        return self.cells[n]
+
+    def add(self, cell):
+        if cell not in self.positions:
+            self.positions[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def discard(self, cell):
+        position = self.positions.pop(cell, None)
+        if position is None:
+            return
+        last = self.cells.pop()
+        if last != cell:
+            self.cells[position] = last
+            self.positions[last] = position
+
+
+class KnowledgeStats():
+    """
+    Counters of what one call to add_knowledge_batch did, and the seconds
+    spent in each of its steps (marking the revealed cells, adding their
+    sentences, marking the cells of decisive sentences, inference).
+    """
+
+    PHASES = ("mark", "sentences", "decisive", "inference")
+
+    def __init__(self, height=None, width=None):
+        self.height = height
+        self.width = width
+        self.cells = 0
+        # turns of the loop alternating decisive sentences and inference
+        self.iterations = 0
+        # sentences compared with (or solved with) the changed ones
+        self.sentences_scanned = 0
+        # new sentences inferred, and inferred ones already known
+        self.inferences = 0
+        self.duplicates = 0
+        # cells found to be mines or safe, beyond the revealed ones
+        self.mines = 0
+        self.safes = 0
+        self.seconds = 0.0
+        self.phases = dict.fromkeys(KnowledgeStats.PHASES, 0.0)
+
+    def lap(self, phase, start):
+        """
+        Adds the time since start to a phase, and returns the time now.
+        """
+        now = time.perf_counter()
+        self.phases[phase] += now - start
+        return now
+
+    def as_dict(self):
+        """
+        Returns the counters as a dictionary that can be dumped to JSON.
+        """
+        res = dict(self.__dict__)
+        res["phases"] = dict(self.phases)
+        return res
+
+
+class KnowledgeProfile():
+    """
+    Collects the KnowledgeStats of every call to add_knowledge_batch of
+    the AIs it is given to (as MinesweeperAI.profile). With a file, each
+    one is also written to it as a line of JSON when the call ends.
+    """
+
+    def __init__(self, file=None):
+        self.file = file
+        self.calls = []
+
+    def record(self, stats):
+        self.calls.append(stats)
+        if self.file is not None:
+            self.file.write(json.dumps(stats.as_dict()) + "\n")
+
+    def write(self, file):
+        """
+        Writes every call collected so far as lines of JSON.
+        """
+        for stats in self.calls:
+            file.write(json.dumps(stats.as_dict()) + "\n")
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
+
+    With height and width None, the board has no end (see
+    chunks.ChunkedMinesweeper): the AI then only keeps track of the cells
+    around its moves, and its work grows with the explored area.
     """
 
-    def __init__(self, height=8, width=8):
+    # Ways to make inferences, chosen with the `inference` argument
+    INFERENCES = ("subset", "matrix")
 
-        # Set initial height and width
+    def __init__(self, height=8, width=8, mines=None, inference="subset", profile=None):
+
+        # Set initial height and width, and number of mines if known
         self.height = height
         self.width = width
+        self.total_mines = mines
+
+        if inference not in MinesweeperAI.INFERENCES:
+            raise ValueError(f"Unknown inference: {inference}")
+        self.inference_method = inference
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
@@ -153,8 +605,64 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Sentences about the game known to be true
+        self.knowledge = KnowledgeBase()
+
+        # KnowledgeProfile collecting the stats of each add_knowledge call,
+        # and the stats of the running call (None when not profiling)
+        self.profile = profile
+        self._stats = None
+
+        # Used to guess when no move is known to be safe
+        # (seeded from `random`, so random.seed makes games reproducible)
+        self.solver = ProbabilitySolver(seed=random.getrandbits(64))
+
+        # Safe cells not chosen yet, oldest first (cells chosen since they
+        # were added are skipped when reaching the front)
+        self.safe_moves = deque()
+
+        if height is None:
+            # Cells near the moves neither chosen nor known to be mines
+            self.nearby = CellSet()
+        else:
+            # Cells neither chosen nor known to be mines, by id i * width + j,
+            # and the position of each id in the list (-1 once removed), to
+            # remove or pick one in constant time (packed arrays: on big boards
+            # lists of ints take several times the memory and time to build)
+            ids = np.arange(height * width, dtype=np.int64).tobytes()
+            self.unknown_ids = array("q", ids)
+            self.unknown_positions = array("q", ids)
+
+    @property
+    def bounded(self):
+        return self.height is not None
+
+    @property
+    def unknown(self):
+        """
+        Sequence of the cells neither chosen nor known to be mines,
+        only the ones near the moves if the board has no end.
+        """
+        if not self.bounded:
+            return self.nearby
+        return CellView(self.unknown_ids, self.width)
+
+    def _forget(self, cell):
+        """
+        Removes a cell from the unknown cells, by swapping it with the last one.
+        """
+        if not self.bounded:
+            self.nearby.discard(cell)
+            return
+        cell_id = cell[0] * self.width + cell[1]
+        position = self.unknown_positions[cell_id]
+        if position < 0:
+            return
+        last = self.unknown_ids.pop()
+        if last != cell_id:
+            self.unknown_ids[position] = last
+            self.unknown_positions[last] = position
+        self.unknown_positions[cell_id] = -1
 
     def mark_mine(self, cell):
         """
@@ -162,40 +670,87 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self._forget(cell)
+        self.knowledge.mark_mine(cell)
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
+        if cell not in self.safes and cell not in self.moves_made:
+            self.safe_moves.append(cell)
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        self.knowledge.mark_safe(cell)
 
-    def in_board(self, cell):
-        return cell[0] >= 0 and cell[1] >= 0 and cell[0] < self.height and cell[1] < self.width
-    
     def inference(self):
-        infer = False
         """
         Called to make inferences to the knowledge.
 
+        Only the sentences added or changed since the last call are
+        compared, and only with the sentences sharing a cell with them:
+        if one is a subset of the other, their difference is a new sentence.
+
+        With the "matrix" inference, see matrix_inference instead.
+
         Returns True if inferences were made.
         """
-        
-        for sentence in self.knowledge:
-            others =  [s for s in self.knowledge if s!= sentence]
-            
-            for o in others:
-                if sentence.cells.issubset(o.cells) and len(sentence.cells) != 0:
-                    new_sentence = Sentence(o.cells.difference(sentence.cells), o.count - sentence.count)
-                    if new_sentence not in self.knowledge:
-                        #inference is found
-                        infer = True
-                        self.knowledge.append(new_sentence)
-        
+        if self.inference_method == "matrix":
+            return self.matrix_inference()
+
+        infer = False
+        stats = self._stats
+
+        for sentence in self.knowledge.pop_dirty():
+            overlapping = self.knowledge.overlapping(sentence)
+            if stats is not None:
+                stats.sentences_scanned += len(overlapping)
+            for o in overlapping:
+                if sentence.is_proper_subset(o):
+                    new_sentence = o.difference(sentence)
+                elif o.is_proper_subset(sentence):
+                    new_sentence = sentence.difference(o)
+                else:
+                    continue
+                if self.knowledge.add(new_sentence):
+                    #inference is found
+                    infer = True
+                    if stats is not None:
+                        stats.inferences += 1
+                elif stats is not None:
+                    stats.duplicates += 1
+
+        return infer
+
+    def matrix_inference(self):
+        """
+        Called to make inferences to the knowledge by linear algebra.
+
+        The sentences linked to the ones added or changed since the last
+        call are reduced together by Gaussian elimination, and the cells
+        it decides are marked as mines or safe.
+
+        Returns True if inferences were made.
+        """
+        changed = self.knowledge.pop_dirty()
+        if not changed:
+            return False
+        sentences = self.knowledge.connected(changed)
+        mines, safes = gauss.infer((s.cells(), s.count) for s in sentences)
+        mines -= self.mines
+        safes -= self.safes
+        if self._stats is not None:
+            self._stats.sentences_scanned += len(sentences)
+            self._stats.mines += len(mines)
+            self._stats.safes += len(safes)
+
+        infer = False
+        for cell in mines:
+            infer = True
+            self.mark_mine(cell)
+        for cell in safes:
+            infer = True
+            self.mark_safe(cell)
         return infer
 
     
@@ -215,48 +770,105 @@ class MinesweeperAI():
                if they can be inferred from existing knowledge
         """
 
-        #1
-        self.moves_made.add(cell)
-        #2
-        self.mark_safe(cell)
+        self.add_knowledge_batch({cell: count})
+
+    def add_knowledge_batch(self, revealed):
+        """
+        Same as add_knowledge for many safe cells at once, such as the
+        ones returned by Minesweeper.reveal: `revealed` maps each cell to
+        its number of neighboring mines. All the sentences are added
+        before making inferences.
+
+        If self.profile is set, a KnowledgeStats of the call is given to it.
+        """
+        if self.profile is None:
+            self._add_knowledge_batch(revealed, None)
+            return
+        stats = self._stats = KnowledgeStats(self.height, self.width)
+        stats.cells = len(revealed)
+        start = time.perf_counter()
+        try:
+            self._add_knowledge_batch(revealed, stats)
+        finally:
+            self._stats = None
+        stats.seconds = time.perf_counter() - start
+        self.profile.record(stats)
+
+    def _add_knowledge_batch(self, revealed, stats):
+        if stats is not None:
+            clock = time.perf_counter()
+
+        #1 and 2
+        for cell in revealed:
+            self.moves_made.add(cell)
+            self._forget(cell)
+            self.mark_safe(cell)
+
+        if stats is not None:
+            clock = stats.lap("mark", clock)
 
         #3
-        new_sentence = Sentence(set(), count)
-        for i in range(cell[0]-1, cell[0]+2):
-            for j in range(cell[1]-1, cell[1]+2):
-                neighbor = (i,j)
-                if self.in_board(neighbor) and neighbor not in self.safes and neighbor not in self.mines:
-                    new_sentence.cells.add(neighbor)
-                if neighbor in self.mines:
-                    new_sentence.count = new_sentence.count - 1
-        self.knowledge.append(new_sentence)
+        stride = CompactSentence.STRIDE
+        for cell, count in revealed.items():
+            rows = range(cell[0]-1, cell[0]+2)
+            columns = range(cell[1]-1, cell[1]+2)
+            if self.bounded:
+                rows = range(max(rows.start, 0), min(rows.stop, self.height))
+                columns = range(max(columns.start, 0), min(columns.stop, self.width))
+            #bits of the 3x3 square around the cell, built in place
+            mask = 0
+            for i in rows:
+                for j in columns:
+                    neighbor = (i,j)
+                    if neighbor in self.mines:
+                        count = count - 1
+                    elif neighbor not in self.safes:
+                        mask |= 1 << ((i - cell[0] + 1) * stride + j - cell[1] + 1)
+            if not self.knowledge.add(CompactSentence(cell[0] - 1, cell[1] - 1, mask, count)):
+                if stats is not None and mask:
+                    stats.duplicates += 1
+
+        if not self.bounded:
+            #cells up to two rows or columns away, beyond the ones in
+            #sentences, to guess from when nothing is known to be safe
+            for cell in revealed:
+                for i in range(cell[0]-2, cell[0]+3):
+                    for j in range(cell[1]-2, cell[1]+3):
+                        neighbor = (i,j)
+                        if neighbor not in self.moves_made and neighbor not in self.mines:
+                            self.nearby.add(neighbor)
+
+        if stats is not None:
+            clock = stats.lap("sentences", clock)
  
         #4
         infer = True
-        stop = False
-
-        #loop while there was an inference OR a new mine/safe tile was found
-        while infer or not stop:
-            #no new mine/safe found
-            stop = True
-            for sentence in self.knowledge:
-                new_mines = sentence.known_mines()
-                new_safes = sentence.known_safes()
-
-                if not (len(new_mines) == 0 and len(new_safes) == 0):
-                    #new mine/safe found
-                    stop = False
-                    for m in new_mines:
-                        self.mark_mine(m)
-                    for s in new_safes:
-                        self.mark_safe(s)
+
+        #loop while there was an inference: only the sentences made
+        #decisive by the last changes are looked at
+        while infer:
+            sentence = self.knowledge.pop_decisive()
+            while sentence is not None:
+                mine = sentence.count > 0
+                cells = sentence.cells()
+                if stats is not None:
+                    if mine:
+                        stats.mines += len(cells)
+                    else:
+                        stats.safes += len(cells)
+                for cell in cells:
+                    if mine:
+                        self.mark_mine(cell)
+                    else:
+                        self.mark_safe(cell)
+                sentence = self.knowledge.pop_decisive()
+            if stats is not None:
+                stats.iterations += 1
+                clock = stats.lap("decisive", clock)
             #5
             infer = self.inference()
-
-            #clean knowledge if empty
-            self.knowledge = [s for s in self.knowledge if len(s.cells) != 0]
-
-
+            if stats is not None:
+                clock = stats.lap("inference", clock)
 
     def make_safe_move(self):
         """
@@ -266,10 +878,14 @@ class MinesweeperAI():
 
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
+
+        Safe cells are queued when marked, so this only drops the ones
+        chosen since from the front of the queue.
         """
-        for cell in self.safes:
-            if cell not in self.moves_made:
-                return cell
+        while self.safe_moves and self.safe_moves[0] in self.moves_made:
+            self.safe_moves.popleft()
+        if self.safe_moves:
+            return self.safe_moves[0]
         return None
 
     def make_random_move(self):
@@ -278,17 +894,29 @@ class MinesweeperAI():
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
-        """
 
-        board = set()
-
-        for i in range(self.height):
-            for j in range(self.width):
-                board.add((i,j))
-            
-        board = board.difference(self.moves_made)
-        board = board.difference(self.mines)
+        Among those, the cell with the lowest probability of being a mine
+        given the knowledge (and the number of mines, if known) is chosen.
+        The candidates are kept in self.unknown as moves are made, so the
+        work only depends on the sentences, not on the size of the board.
+        On a board with no end, the first move is (0, 0) (or the first
+        cell after it on row 0 that is not known), then the cells no
+        sentence talks about are only drawn from the ones near moves.
+        """
 
-        if len(board) != 0:
-            return random.sample(board, 1)[0]
-        return None
+        if not self.bounded and not self.nearby:
+            cell = (0, 0)
+            while cell in self.mines or cell in self.moves_made:
+                cell = (0, cell[1] + 1)
+            return cell
+        if not self.unknown:
+            return None
+        safe = self.make_safe_move()
+        if safe is not None:
+            return safe
+
+        mines_left = None
+        if self.total_mines is not None:
+            mines_left = self.total_mines - len(self.mines)
+        sentences = [(s.cells(), s.count) for s in self.knowledge]
+        return self.solver.safest(sentences, self.unknown, mines_left, bounded=self.bounded)
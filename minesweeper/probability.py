@@ -0,0 +1,370 @@
+"""
+Mine probabilities for Minesweeper
+
+The cells of the knowledge base sentences (the frontier) are split into
+independent components: groups of cells linked by sentences. For each
+component, every mine configuration consistent with its sentences is
+counted by number of mines. The configurations of all components and of
+the cells no sentence talks about are then weighted by the number of ways
+to place the remaining mines, which gives the exact probability of each
+cell being a mine.
+
+Components too big to enumerate are sampled instead.
+"""
+
+import random
+from collections import OrderedDict
+
+
+class _TooLarge(Exception):
+    """Raised when the enumeration of a component is over budget"""
+    pass
+
+
+class ProbabilitySolver():
+    """
+    Computes the probability of each unknown cell being a mine.
+
+    The configuration counts of each component are cached by its
+    sentences, so components left untouched by a move are not counted
+    again on the next turn.
+    """
+
+    def __init__(self, max_nodes=100000, samples=200, cache_size=1000, seed=None):
+        self.max_nodes = max_nodes
+        self.samples = samples
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.rng = random.Random(seed)
+
+    def probabilities(self, sentences, unknown, mines_left=None):
+        """
+        Returns a dictionary mapping every cell of `unknown` (cells neither
+        revealed nor known to be mines) to its probability of being a mine.
+
+        `sentences` are (cells, count) pairs over unknown cells, and
+        `mines_left` the number of mines not known yet, if it is known.
+        """
+        unknown = set(unknown)
+        res, density = self._solve(sentences, len(unknown), mines_left)
+        for cell in unknown:
+            if cell not in res:
+                res[cell] = density
+        return res
+
+    def safest(self, sentences, unknown, mines_left=None, bounded=True):
+        """
+        Returns one of the unknown cells least likely to be a mine,
+        or None if there is no unknown cell.
+
+        Cells no sentence talks about are all as likely to be mines, so
+        they are not listed: when they are the safest, one of them is drawn
+        from `unknown` (best given as a sequence rather than a set).
+
+        If the board is not bounded, `unknown` only holds some of the
+        unknown cells, there being no end to the others.
+        """
+        if not unknown:
+            return None
+        probabilities, density = self._solve(
+            sentences, len(unknown) if bounded else None, mines_left
+        )
+        others = len(unknown) - len(probabilities)
+
+        best = min(probabilities.values(), default=1.0)
+        if others:
+            best = min(best, density)
+        candidates = sorted(cell for cell, p in probabilities.items() if p <= best + 1e-12)
+        if others and density <= best + 1e-12:
+            n = self.rng.randrange(len(candidates) + others)
+            if n >= len(candidates):
+                return self._other(unknown, probabilities)
+            return candidates[n]
+        return self.rng.choice(candidates)
+
+    def _other(self, unknown, frontier):
+        """
+        Returns a random cell of unknown not in frontier.
+        """
+        if isinstance(unknown, (set, frozenset)):
+            unknown = sorted(unknown)
+        # most unknown cells are usually not on the frontier
+        for _ in range(64):
+            cell = self.rng.choice(unknown)
+            if cell not in frontier:
+                return cell
+        return self.rng.choice([cell for cell in unknown if cell not in frontier])
+
+    def _solve(self, sentences, unknown, mines_left):
+        """
+        Returns (probabilities, density): the probability of each cell of
+        the sentences being a mine, and the probability of each of the
+        other cells of the `unknown` unknown cells being a mine (None if
+        there is no end to them).
+        """
+        components = self._components(sentences)
+        frontier = set()
+        counts = []
+        for component in components:
+            counts.append(self._count(component))
+            for cells, _ in component:
+                frontier.update(cells)
+        others = None if unknown is None else unknown - len(frontier)
+
+        # distributions of the number of mines of all components but one
+        polynomials = [totals for totals, _ in counts]
+        prefix = [{0: 1}]
+        for polynomial in polynomials:
+            prefix.append(_convolve(prefix[-1], polynomial))
+        suffix = [{0: 1}]
+        for polynomial in reversed(polynomials):
+            suffix.append(_convolve(suffix[-1], polynomial))
+        suffix.reverse()
+        everything = prefix[-1]
+
+        # weight of the frontier having s mines: ways to place the others
+        if mines_left is None or others is None:
+            def weight(s):
+                return 1
+        else:
+            weights = _weights(others, mines_left, max(everything, default=0))
+
+            def weight(s):
+                return weights[s]
+
+        total = sum(ways * weight(s) for s, ways in everything.items())
+        if total == 0:
+            # no consistent configuration, knowledge was sampled too roughly
+            return {cell: 0.5 for cell in frontier}, 0.5
+
+        res = {}
+        for n, (totals, mines_by_cell) in enumerate(counts):
+            rest = _convolve(prefix[n], suffix[n + 1])
+            found = {}
+            for k, cell_counts in mines_by_cell.items():
+                factor = sum(ways * weight(k + s) for s, ways in rest.items())
+                for cell, ways in cell_counts.items():
+                    found[cell] = found.get(cell, 0) + ways * factor
+            for cells, _ in components[n]:
+                for cell in cells:
+                    res[cell] = found.get(cell, 0) / total
+
+        if mines_left is None or others is None:
+            # no global count: guess the density of the frontier
+            density = sum(res.values()) / len(res) if res else 0.5
+        elif others:
+            density = sum(
+                ways * weight(s) * (mines_left - s) for s, ways in everything.items()
+            ) / (total * others)
+        else:
+            density = 0.5
+        return res, density
+
+    def _components(self, sentences):
+        """
+        Returns the sentences grouped in components, as lists of
+        (frozenset of cells, count) pairs.
+        """
+        parent = {}
+
+        def find(cell):
+            while parent[cell] != cell:
+                parent[cell] = parent[parent[cell]]
+                cell = parent[cell]
+            return cell
+
+        pairs = []
+        for cells, count in sentences:
+            cells = frozenset(cells)
+            if not cells:
+                continue
+            pairs.append((cells, count))
+            first = None
+            for cell in cells:
+                parent.setdefault(cell, cell)
+                if first is None:
+                    first = find(cell)
+                else:
+                    parent[find(cell)] = first
+
+        groups = {}
+        for cells, count in pairs:
+            groups.setdefault(find(next(iter(cells))), []).append((cells, count))
+        return list(groups.values())
+
+    def _count(self, component):
+        """
+        Returns (totals, mines_by_cell) for a component: totals maps each
+        number of mines k to the number of consistent configurations with
+        k mines, and mines_by_cell[k] maps each cell to the number of those
+        configurations where it is a mine.
+        """
+        key = frozenset(component)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        try:
+            res = self._enumerate(component)
+        except _TooLarge:
+            res = self._sample(component)
+
+        self.cache[key] = res
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return res
+
+    def _prepare(self, component):
+        # cells in breadth first order through the sentences, so that each
+        # sentence has all its cells assigned soon after its first one
+        sentences_of = {}
+        for n, (sentence_cells, _) in enumerate(component):
+            for cell in sentence_cells:
+                sentences_of.setdefault(cell, []).append(n)
+        start = min(component, key=lambda s: len(s[0]))[0]
+        cells = sorted(start)
+        seen = set(cells)
+        for cell in cells:
+            for n in sentences_of[cell]:
+                for other in sorted(component[n][0] - seen):
+                    seen.add(other)
+                    cells.append(other)
+
+        position = {cell: n for n, cell in enumerate(cells)}
+        cell_sentences = [[] for _ in cells]
+        remaining = []
+        unassigned = []
+        for n, (sentence_cells, count) in enumerate(component):
+            remaining.append(count)
+            unassigned.append(len(sentence_cells))
+            for cell in sentence_cells:
+                cell_sentences[position[cell]].append(n)
+        return cells, cell_sentences, remaining, unassigned
+
+    def _enumerate(self, component):
+        cells, cell_sentences, remaining, unassigned = self._prepare(component)
+        totals = {}
+        mines_by_cell = {}
+        for chosen in _configurations(cells, cell_sentences, remaining, unassigned, self.max_nodes):
+            _tally(totals, mines_by_cell, chosen)
+        return totals, mines_by_cell
+
+    def _sample(self, component):
+        """
+        Same as _enumerate, counting the distinct consistent configurations
+        found by randomized searches instead of all of them.
+        """
+        cells, cell_sentences, remaining, unassigned = self._prepare(component)
+        totals = {}
+        mines_by_cell = {}
+        budget = max(10 * len(cells), self.max_nodes // max(1, self.samples))
+        found = set()
+        for _ in range(self.samples):
+            search = _configurations(cells, cell_sentences, remaining, unassigned, budget, self.rng)
+            try:
+                chosen = next(search, None)
+            except _TooLarge:
+                chosen = None
+            if chosen is not None and frozenset(chosen) not in found:
+                found.add(frozenset(chosen))
+                _tally(totals, mines_by_cell, chosen)
+        return totals, mines_by_cell
+
+
+def _configurations(cells, cell_sentences, remaining, unassigned, budget, rng=None):
+    """
+    Yields the lists of mine cells of every configuration consistent with
+    the sentences, by depth first search over the cells (without recursion,
+    components can have thousands of cells). Values are tried in random
+    order if rng is given. Raises _TooLarge after `budget` assignments.
+    """
+    remaining = list(remaining)
+    unassigned = list(unassigned)
+    size = len(cells)
+    options = [None] * size
+    choice = [None] * size
+    nodes = 0
+    n = 0
+
+    def apply(n, value, sign):
+        ok = True
+        for s in cell_sentences[n]:
+            remaining[s] -= sign * value
+            unassigned[s] -= sign
+            if not (0 <= remaining[s] <= unassigned[s]):
+                ok = False
+        return ok
+
+    while n >= 0:
+        if n == size:
+            yield [cells[i] for i in range(size) if choice[i]]
+            n -= 1
+            continue
+        if options[n] is None:
+            # values are popped from the end: safe first, or when sampling,
+            # mine first with the density of mines left in its sentences
+            options[n] = [1, 0]
+            if rng is not None and cell_sentences[n]:
+                density = sum(
+                    remaining[s] / unassigned[s] for s in cell_sentences[n]
+                ) / len(cell_sentences[n])
+                if rng.random() < density:
+                    options[n] = [0, 1]
+        if choice[n] is not None:
+            apply(n, choice[n], -1)
+            choice[n] = None
+        if not options[n]:
+            options[n] = None
+            n -= 1
+            continue
+
+        nodes += 1
+        if nodes > budget:
+            raise _TooLarge
+        value = options[n].pop()
+        choice[n] = value
+        if apply(n, value, 1):
+            n += 1
+
+
+def _weights(others, mines_left, most):
+    """
+    Returns a list whose item s, for s from 0 to most, is proportional to
+    comb(others, mines_left - s). The binomials themselves are huge on big
+    boards, so the items are built from the ratios of consecutive ones.
+    """
+    res = [0] * (most + 1)
+    low = max(0, mines_left - most)
+    high = min(others, mines_left)
+    if low > high:
+        return res
+    # comb(others, r) * (high! / low!) / comb(others, low) is the product
+    # of (others - x + 1) for x in (low, r] and of x for x in (r, high]
+    rising = [1]
+    for x in range(low + 1, high + 1):
+        rising.append(rising[-1] * (others - x + 1))
+    falling = 1
+    for r in range(high, low - 1, -1):
+        res[mines_left - r] = rising[r - low] * falling
+        falling *= r
+    return res
+
+
+def _tally(totals, mines_by_cell, chosen):
+    k = len(chosen)
+    totals[k] = totals.get(k, 0) + 1
+    cell_counts = mines_by_cell.setdefault(k, {})
+    for cell in chosen:
+        cell_counts[cell] = cell_counts.get(cell, 0) + 1
+
+
+def _convolve(a, b):
+    """
+    Returns the distribution of the sum of two numbers of mines, each given
+    as a dictionary mapping a number to its number of configurations.
+    """
+    res = {}
+    for i, x in a.items():
+        for j, y in b.items():
+            res[i + j] = res.get(i + j, 0) + x * y
+    return res
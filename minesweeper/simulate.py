@@ -0,0 +1,166 @@
+"""
+Headless simulation of the Minesweeper AI
+
+Plays seeded games of MinesweeperAI on several board configurations in a
+pool of processes, and reports the win rate, the number of moves per game
+and the latency of the moves. Game n of a configuration uses seed + n, so
+runs are reproducible whatever the number of workers.
+
+With --profile FILE, the KnowledgeStats of every add_knowledge call are
+written to FILE as lines of JSON, along with the board and seed of the game.
+
+Usage: python simulate.py [--boards HxW/M ...] [--games N] [--seed S]
+                          [--workers W] [--inference subset|matrix]
+                          [--profile FILE] [--json]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from minesweeper import KnowledgeProfile, Minesweeper, MinesweeperAI
+
+BOARDS = ["8x8/8", "16x16/40", "30x16/99"]
+
+
+def parse_board(text):
+    """
+    Returns (height, width, mines) from a "HxW/M" string.
+    """
+    try:
+        size, mines = text.split("/")
+        height, width = size.split("x")
+        return int(height), int(width), int(mines)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid board: {text}, expected HxW/M")
+
+
+def percentile(values, p):
+    """
+    Returns the p-th percentile (0 to 100) of values, by nearest rank:
+    the smallest value with at least p% of the values at or below it.
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    # p * n / 100 rather than p / 100 * n, which can land just above an
+    # integer (7 / 100 * 100 is 7.000000000000001)
+    rank = max(0, min(len(values) - 1, math.ceil(p * len(values) / 100) - 1))
+    return values[rank]
+
+
+def play(height, width, mines, seed, inference="subset", profile=False):
+    """
+    Plays one game and returns (won, latency of every move, profile). A
+    move is choosing a cell and adding what revealing it shows to the
+    knowledge. With profile=True, profile is the list of the stats of every
+    add_knowledge call as dictionaries, otherwise it is empty.
+    """
+    random.seed(seed)
+    game = Minesweeper(height, width, mines, seed=seed)
+    ai = MinesweeperAI(height, width, mines=mines, inference=inference,
+                       profile=KnowledgeProfile() if profile else None)
+    latencies = []
+    won = True
+    while len(ai.moves_made) < height * width - mines:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        if game.is_mine(move):
+            latencies.append(time.perf_counter() - start)
+            won = False
+            break
+        ai.add_knowledge_batch(game.reveal(move))
+        latencies.append(time.perf_counter() - start)
+
+    calls = []
+    if profile:
+        board = f"{height}x{width}/{mines}"
+        calls = [{"board": board, "seed": seed} | stats.as_dict() for stats in ai.profile.calls]
+    return won, latencies, calls
+
+
+def _play_seed(args):
+    return play(*args)
+
+
+def run(boards=BOARDS, games=1000, seed=0, workers=None, inference="subset", profile=None):
+    """
+    Plays `games` games on each board and returns a report dictionary.
+    The stats of every add_knowledge call are written as lines of JSON to
+    the `profile` file, if given.
+    """
+    workers = workers or os.cpu_count()
+    report = {
+        "games": games, "seed": seed, "workers": workers,
+        "inference": inference, "boards": {},
+    }
+    with ProcessPoolExecutor(workers) as pool:
+        for board in boards:
+            height, width, mines = parse_board(board)
+            tasks = [
+                (height, width, mines, seed + n, inference, profile is not None)
+                for n in range(games)
+            ]
+            start = time.perf_counter()
+            results = list(pool.map(_play_seed, tasks, chunksize=max(1, games // (4 * workers))))
+            elapsed = time.perf_counter() - start
+
+            wins = sum(won for won, _, _ in results)
+            latencies = [latency for _, moves, _ in results for latency in moves]
+            if profile is not None:
+                for _, _, calls in results:
+                    for call in calls:
+                        profile.write(json.dumps(call) + "\n")
+            report["boards"][board] = {
+                "wins": wins,
+                "win_rate": wins / games if games else 0.0,
+                "moves_per_game": len(latencies) / games if games else 0.0,
+                "games_per_second": games / elapsed,
+                "latency_us": {
+                    f"p{p}": percentile(latencies, p) * 1e6 for p in (50, 90, 99)
+                } | {"max": max(latencies, default=0.0) * 1e6},
+            }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--boards", nargs="+", default=BOARDS, help="boards as HxW/M")
+    parser.add_argument("--games", type=int, default=1000, help="games played on each board")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="processes (one per core by default)")
+    parser.add_argument("--inference", choices=MinesweeperAI.INFERENCES, default="subset")
+    parser.add_argument("--profile", metavar="FILE", help="write the stats of add_knowledge calls to FILE")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+    for board in args.boards:
+        try:
+            parse_board(board)
+        except argparse.ArgumentTypeError as e:
+            parser.error(str(e))
+
+    if args.profile:
+        with open(args.profile, "w") as profile:
+            report = run(args.boards, args.games, args.seed, args.workers, args.inference, profile)
+    else:
+        report = run(args.boards, args.games, args.seed, args.workers, args.inference)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for board, stats in report["boards"].items():
+        latency = stats["latency_us"]
+        print(f"{board}: won {stats['wins']}/{report['games']} ({stats['win_rate']:.1%}), "
+              f"{stats['moves_per_game']:.1f} moves/game, {stats['games_per_second']:.0f} games/s")
+        print(f"    move latency p50 {latency['p50']:.1f}us p90 {latency['p90']:.1f}us "
+              f"p99 {latency['p99']:.1f}us max {latency['max']:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Snapshots of Minesweeper games
+
+A snapshot file holds a game and the state of its AI, as packed arrays
+read back with numpy in one pass:
+    header      magic, token, height, width, mines, AI total mines (-1 if
+                unknown), inference method, number of flags and of sentences
+    bitmaps     one bit per cell, rows first: the mines of the board, the
+                revealed cells, the player's flags, then the AI moves made,
+                mines and safes
+    sentences   (row, col, mask, count) of every CompactSentence
+
+Saving after each move would rewrite all of that, so moves can instead be
+appended to a log next to the snapshot (filename + ".log"): the token of
+the snapshot, then for each move the number of revealed cells and the
+(i, j, count) of each one. Loading replays the log, and a log whose token
+is not the one of the snapshot (left by a crash while saving) is ignored,
+as is a move cut short at its end.
+
+Usage:
+    save("game.snap", game, ai)      after any number of moves
+    append("game.snap", revealed)    after each move, with what reveal returned
+    game, ai = load("game.snap")
+"""
+
+import os
+import random
+import struct
+from array import array
+from collections import deque
+
+import numpy as np
+
+from minesweeper import CompactSentence, Minesweeper, MinesweeperAI
+
+MAGIC = b"MSS1"
+HEADER = struct.Struct("<4sQIIIqBQQ")
+MOVE = struct.Struct("<I")
+TOKEN = struct.Struct("<Q")
+
+CELL = np.dtype([("i", "<i4"), ("j", "<i4"), ("count", "u1")])
+SENTENCE = np.dtype([("row", "<i8"), ("col", "<i8"), ("mask", "<u4"), ("count", "<i2")])
+
+
+def _log_file(filename):
+    return filename + ".log"
+
+
+def _bits(shape, cells):
+    array = np.zeros(shape, dtype=bool)
+    if cells:
+        rows, columns = zip(*cells)
+        array[list(rows), list(columns)] = True
+    return np.packbits(array)
+
+
+def _cells(bits, shape):
+    rows, columns = np.nonzero(bits)
+    return set(zip(rows.tolist(), columns.tolist()))
+
+
+def save(filename, game, ai):
+    """
+    Writes a snapshot of a game and its AI to filename, and starts an
+    empty log for the next moves. Boards with no end are not supported.
+    """
+    if not ai.bounded:
+        raise ValueError("Snapshots need a bounded board")
+    shape = (game.height, game.width)
+    token = random.getrandbits(64)
+    sentences = np.array(
+        [(s.row, s.col, s.mask, s.count) for s in ai.knowledge], dtype=SENTENCE
+    )
+    header = HEADER.pack(
+        MAGIC, token, game.height, game.width, int(game.board.sum()),
+        -1 if ai.total_mines is None else ai.total_mines,
+        MinesweeperAI.INFERENCES.index(ai.inference_method),
+        len(game.mines_found), len(sentences),
+    )
+
+    # write next to the file then move it over, so a crash never leaves
+    # a partial snapshot
+    temporary = filename + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(header)
+        f.write(np.packbits(game.board).tobytes())
+        f.write(np.packbits(game.revealed).tobytes())
+        for cells in (game.mines_found, ai.moves_made, ai.mines, ai.safes):
+            f.write(_bits(shape, cells).tobytes())
+        f.write(sentences.tobytes())
+    os.replace(temporary, filename)
+    with open(_log_file(filename), "wb") as f:
+        f.write(TOKEN.pack(token))
+
+
+def append(filename, revealed):
+    """
+    Appends a move to the log of the snapshot in filename: `revealed`
+    maps each revealed cell to its number of neighboring mines.
+    """
+    cells = np.array([(i, j, count) for (i, j), count in revealed.items()], dtype=CELL)
+    with open(_log_file(filename), "ab") as f:
+        f.write(MOVE.pack(len(cells)) + cells.tobytes())
+
+
+def load(filename):
+    """
+    Returns the (game, ai) saved in filename, with the moves of its log
+    replayed.
+    """
+    with open(filename, "rb") as f:
+        data = f.read()
+    (magic, token, height, width, _, total_mines, inference,
+     flags, sentences) = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"Not a Minesweeper snapshot: {filename}")
+    shape = (height, width)
+    size = height * width
+    packed = (size + 7) // 8
+    offset = HEADER.size
+
+    bitmaps = []
+    for _ in range(6):
+        bits = np.frombuffer(data, dtype=np.uint8, count=packed, offset=offset)
+        bitmaps.append(np.unpackbits(bits, count=size).reshape(shape).view(bool))
+        offset += packed
+    board, revealed, found, moves_made, mines, safes = bitmaps
+
+    game = Minesweeper.from_board(board)
+    game.revealed = revealed.copy()
+    game.mines_found = _cells(found, shape)
+
+    ai = MinesweeperAI(height, width, None if total_mines < 0 else total_mines,
+                       MinesweeperAI.INFERENCES[inference])
+    ai.moves_made = _cells(moves_made, shape)
+    ai.mines = _cells(mines, shape)
+    ai.safes = _cells(safes, shape)
+    ai.safe_moves = deque(sorted(ai.safes - ai.moves_made))
+    ids = np.flatnonzero(~(moves_made | mines))
+    positions = np.full(size, -1, dtype=np.int64)
+    positions[ids] = np.arange(len(ids))
+    ai.unknown_ids = array("q", ids.astype(np.int64).tobytes())
+    ai.unknown_positions = array("q", positions.tobytes())
+
+    records = np.frombuffer(data, dtype=SENTENCE, count=sentences, offset=offset)
+    for row, col, mask, count in records.tolist():
+        ai.knowledge.add(CompactSentence(row, col, mask, count))
+    # the saved knowledge had nothing left to infer
+    ai.knowledge.queue.clear()
+    ai.knowledge.dirty.clear()
+
+    for move in _log_moves(filename, token):
+        ai.add_knowledge_batch(move)
+        for i, j in move:
+            game.revealed[i, j] = True
+    return game, ai
+
+
+def _log_moves(filename, token):
+    """
+    Yields the moves of the log of filename, as dictionaries from cell to
+    count, if the log belongs to the snapshot with this token.
+    """
+    try:
+        with open(_log_file(filename), "rb") as f:
+            data = f.read()
+    except OSError:
+        return
+    if len(data) < TOKEN.size or TOKEN.unpack_from(data)[0] != token:
+        return
+    offset = TOKEN.size
+    while offset + MOVE.size <= len(data):
+        (length,) = MOVE.unpack_from(data, offset)
+        offset += MOVE.size
+        if offset + length * CELL.itemsize > len(data):
+            # cut short by a crash while appending
+            return
+        cells = np.frombuffer(data, dtype=CELL, count=length, offset=offset)
+        offset += length * CELL.itemsize
+        yield {(i, j): count for i, j, count in cells.tolist()}
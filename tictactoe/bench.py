@@ -0,0 +1,117 @@
+"""
+Benchmarks of the Tic Tac Toe engines
+
+Usage: python bench.py [parallel] [mcts]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import wait
+
+import mcts
+import mnk
+import parallel
+import tictactoe as ttt
+
+
+def _timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    res = function(*args, **kwargs)
+    return res, time.perf_counter() - start
+
+
+def _warm(pool, workers):
+    """
+    Starts every process of the pool before timing it.
+    """
+    wait([pool.submit(time.sleep, 0.1) for _ in range(workers)])
+
+
+def bench_parallel(repeat=5):
+    """
+    Prints the time of a cold empty board search, serial then by number of
+    workers. Tables are emptied (and pools restarted) before every search.
+    """
+    board = ttt.initial_state()
+    serial = []
+    for _ in range(repeat):
+        ttt.table.clear()
+        move, elapsed = _timed(ttt.minimax, board, use_book=False)
+        serial.append(elapsed)
+    base = min(serial)
+    print(f"serial     {base * 1000:8.2f}ms  move {move}")
+
+    for workers in range(1, (os.cpu_count() or 1) + 1):
+        times = []
+        for _ in range(repeat):
+            parallel.shutdown()
+            ttt.table.clear()
+            _warm(parallel.get_pool(workers), workers)
+            res, elapsed = _timed(parallel.minimax, board, workers)
+            if res != move:
+                raise RuntimeError(f"Parallel move {res} differs from serial move {move}")
+            times.append(elapsed)
+        best = min(times)
+        print(f"{workers:2d} workers {best * 1000:8.2f}ms  speedup {base / best:5.2f}x")
+    parallel.shutdown()
+
+
+def _match(game, engines, budget):
+    """
+    Plays one game between engines, a dictionary mapping X and O to
+    objects with a best_move(state, budget) method. Returns the winner.
+    """
+    state = game.initial_state()
+    while not game.terminal(state):
+        engine = engines[game.player(state)]
+        state = game.result(state, engine.best_move(state, budget))
+    return game.winner(state)
+
+
+def bench_mcts(budgets=(0.01, 0.05, 0.2), games=4):
+    """
+    Prints the results of MCTS against the alpha-beta search for several
+    time budgets per move, on 3x3 and 5x5 with 4 in a row. Each engine
+    plays X in half of the games.
+    """
+    for m, n, k in ((3, 3, 3), (5, 5, 4)):
+        game = mnk.Game(m, n, k)
+        for budget in budgets:
+            outcomes = {"mcts": 0, "alpha-beta": 0, "tie": 0}
+            visits = []
+            for i in range(games):
+                tree = mcts.MCTS(game, seed=i)
+                search = mnk.Search(game)
+                mcts_player = ttt.X if i % 2 == 0 else ttt.O
+                engines = {
+                    mcts_player: tree,
+                    ttt.O if mcts_player == ttt.X else ttt.X: search,
+                }
+                winner = _match(game, engines, budget)
+                if winner is None:
+                    outcomes["tie"] += 1
+                else:
+                    outcomes["mcts" if winner == mcts_player else "alpha-beta"] += 1
+                visits.append(tree.root.visits)
+            print(f"{m}x{n} k={k} budget {budget * 1000:5.0f}ms  {outcomes}  "
+                  f"last root visits {sum(visits) / len(visits):.0f}")
+
+
+BENCHMARKS = {
+    "parallel": bench_parallel,
+    "mcts": bench_mcts,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            sys.exit(f"Unknown benchmark: {name}")
+        print(f"== {name}")
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Compact Tic Tac Toe engine
+
+A state is a pair (x, o) of 9-bit integers, bit i * 3 + j being set
+when the player owns the cell (i, j).
+"""
+
+X = "X"
+O = "O"
+EMPTY = None
+
+FULL = 0b111111111
+
+# Rows, columns and diagonals as bit masks
+LINES = [
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+]
+
+
+class NotValidAction(Exception):
+    """Raised when action is not possible for the board"""
+    pass
+
+
+def _wins(bits):
+    return any(bits & line == line for line in LINES)
+
+# For every possible set of cells, whether it contains a full line
+WINS = [_wins(bits) for bits in range(FULL + 1)]
+# For every possible set of cells, its number of cells
+POPCOUNT = [bin(bits).count("1") for bits in range(FULL + 1)]
+# For every possible set of empty cells, their indexes in increasing order
+MOVES = [
+    tuple(cell for cell in range(9) if bits >> cell & 1)
+    for bits in range(FULL + 1)
+]
+
+
+def initial_state():
+    """
+    Returns starting state of the board.
+    """
+    return (0, 0)
+
+
+def from_board(board):
+    """
+    Returns the state of a list of lists board.
+    """
+    x = o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                x |= 1 << (i * 3 + j)
+            elif board[i][j] == O:
+                o |= 1 << (i * 3 + j)
+    return (x, o)
+
+
+def to_board(state):
+    """
+    Returns the list of lists board of a state.
+    """
+    x, o = state
+    board = []
+    for i in range(3):
+        row = []
+        for j in range(3):
+            bit = 1 << (i * 3 + j)
+            row.append(X if x & bit else O if o & bit else EMPTY)
+        board.append(row)
+    return board
+
+
+def player(state):
+    """
+    Returns player who has the next turn on a board.
+    """
+    x, o = state
+    return X if POPCOUNT[x] == POPCOUNT[o] else O
+
+
+def moves(state):
+    """
+    Returns the indexes of the empty cells, in increasing order.
+    """
+    return MOVES[FULL ^ (state[0] | state[1])]
+
+
+def actions(state):
+    """
+    Returns set of all possible actions (i, j) available on the board.
+    """
+    return set(divmod(cell, 3) for cell in moves(state))
+
+
+def play(state, cell):
+    """
+    Returns the state after the player to move takes the cell index,
+    without checking that it is empty.
+    """
+    x, o = state
+    if POPCOUNT[x] == POPCOUNT[o]:
+        return (x | 1 << cell, o)
+    return (x, o | 1 << cell)
+
+
+def result(state, action):
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    i, j = action
+    cell = i * 3 + j
+    if not (0 <= i < 3 and 0 <= j < 3) or (state[0] | state[1]) >> cell & 1:
+        raise NotValidAction
+    return play(state, cell)
+
+
+def winner(state):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    if WINS[state[0]]:
+        return X
+    elif WINS[state[1]]:
+        return O
+    return None
+
+
+def terminal(state):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    x, o = state
+    return WINS[x] or WINS[o] or x | o == FULL
+
+
+def utility(state):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    if WINS[state[0]]:
+        return 1
+    elif WINS[state[1]]:
+        return -1
+    return 0
+
+
+# Indexes in LINES of the lines going through each cell
+CELL_LINES = [
+    tuple(n for n, line in enumerate(LINES) if line >> cell & 1)
+    for cell in range(9)
+]
+
+
+class GameState():
+    """
+    Mutable state for searching: moves are made and undone in place.
+
+    The number of cells of each player on every line is kept up to date,
+    so knowing if the game is over after a move costs O(1).
+    """
+
+    __slots__ = ("x", "o", "count", "x_lines", "o_lines", "won")
+
+    def __init__(self, state=(0, 0)):
+        x, o = state
+        self.x = x
+        self.o = o
+        self.count = POPCOUNT[x | o]
+        self.x_lines = [POPCOUNT[x & line] for line in LINES]
+        self.o_lines = [POPCOUNT[o & line] for line in LINES]
+        self.won = winner(state)
+
+    def state(self):
+        """
+        Returns the (x, o) state.
+        """
+        return (self.x, self.o)
+
+    def player(self):
+        """
+        Returns player who has the next turn on a board.
+        """
+        return O if self.count & 1 else X
+
+    def moves(self):
+        """
+        Returns the indexes of the empty cells, in increasing order.
+        """
+        return MOVES[FULL ^ (self.x | self.o)]
+
+    def make(self, cell):
+        """
+        Plays the empty cell for the player to move.
+        """
+        if self.count & 1:
+            self.o |= 1 << cell
+            lines = self.o_lines
+            mover = O
+        else:
+            self.x |= 1 << cell
+            lines = self.x_lines
+            mover = X
+        self.count += 1
+        for n in CELL_LINES[cell]:
+            lines[n] += 1
+            if lines[n] == 3:
+                self.won = mover
+
+    def undo(self, cell):
+        """
+        Takes back the last move, made on cell.
+        """
+        self.count -= 1
+        if self.count & 1:
+            self.o ^= 1 << cell
+            lines = self.o_lines
+        else:
+            self.x ^= 1 << cell
+            lines = self.x_lines
+        for n in CELL_LINES[cell]:
+            lines[n] -= 1
+        if self.won is not None:
+            self.won = winner((self.x, self.o))
+
+    def terminal(self):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        return self.won is not None or self.count == 9
+
+    def utility(self):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        if self.won == X:
+            return 1
+        elif self.won == O:
+            return -1
+        return 0
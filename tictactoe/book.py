@@ -0,0 +1,115 @@
+"""
+Perfect play table for Tic Tac Toe
+
+Every reachable state is solved once by `python book.py`, and the best
+move and value of each one is written to book.bin. The file holds one byte
+per base 3 encoding of a state (0 empty, 1 X, 2 O for each cell):
+    (cell << 2) | (value + 1)  for a state where the game is not over
+    NONE                       for a terminal or unreachable state
+"""
+
+import os
+import time
+
+import bitboard
+
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+SIZE = 3 ** 9
+NONE = 0xFF
+
+# For every 9-bit set of cells, the sum of 3 ** cell
+_TERNARY = [
+    sum(3 ** cell for cell in range(9) if bits >> cell & 1)
+    for bits in range(bitboard.FULL + 1)
+]
+
+
+def index(state):
+    """
+    Returns the position of a state in the table.
+    """
+    x, o = state
+    return _TERNARY[x] + 2 * _TERNARY[o]
+
+
+def _solve(state, values):
+    """
+    Returns the exact value of a state, filling `values` with the
+    (best cell, value) pair of every non terminal state below it.
+    """
+    if bitboard.terminal(state):
+        return bitboard.utility(state)
+    key = index(state)
+    if key in values:
+        return values[key][1]
+
+    maximize = bitboard.player(state) == bitboard.X
+    best = None
+    for cell in bitboard.moves(state):
+        value = _solve(bitboard.play(state, cell), values)
+        # keep the first best cell, as minimax does
+        if best is None or (value > best[1] if maximize else value < best[1]):
+            best = (cell, value)
+    values[key] = best
+    return best[1]
+
+
+def build(filename=BOOK_FILE):
+    """
+    Solves every reachable state and writes the table to filename.
+    """
+    values = {}
+    _solve(bitboard.initial_state(), values)
+    table = bytearray([NONE]) * SIZE
+    for key, (cell, value) in values.items():
+        table[key] = cell << 2 | (value + 1)
+    with open(filename, "wb") as f:
+        f.write(table)
+    return len(values)
+
+
+def load(filename=BOOK_FILE):
+    """
+    Returns the table stored in filename, or None if there is none.
+    """
+    try:
+        with open(filename, "rb") as f:
+            table = f.read()
+    except OSError:
+        return None
+    if len(table) != SIZE:
+        return None
+    return table
+
+
+def lookup(table, state):
+    """
+    Returns the (best cell, value) pair of a state, or None if the
+    state is terminal or not reachable.
+    """
+    entry = table[index(state)]
+    if entry == NONE:
+        return None
+    return (entry >> 2, (entry & 0b11) - 1)
+
+
+def main():
+    start = time.perf_counter()
+    positions = build()
+    print(f"Solved {positions} positions in {time.perf_counter() - start:.3f}s")
+    print(f"Table size: {os.path.getsize(BOOK_FILE)} bytes")
+
+    start = time.perf_counter()
+    table = load()
+    print(f"Cold load: {(time.perf_counter() - start) * 1e6:.1f}us")
+
+    state = bitboard.initial_state()
+    n = 100000
+    start = time.perf_counter()
+    for _ in range(n):
+        lookup(table, state)
+    print(f"Lookup: {(time.perf_counter() - start) / n * 1e9:.0f}ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Load generator for the Tic Tac Toe game server
+
+Opens many connections at once, each one playing games with random moves,
+and reports the number of requests and moves per second and the latency
+of the moves.
+
+Usage: python loadgen.py [--host HOST] [--port PORT] [--clients N] [--games G] [--seed S] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from selfplay import percentile
+
+
+async def _request(reader, writer, request):
+    writer.write(json.dumps(request).encode() + b"\n")
+    await writer.drain()
+    response = json.loads(await reader.readline())
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    return response
+
+
+async def client(host, port, games, rng, latencies):
+    """
+    Plays games on one connection, appending the latency of every request
+    to the list of its op in latencies.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(games):
+            start = time.perf_counter()
+            state = await _request(reader, writer, {"op": "new", "player": rng.choice("XO")})
+            latencies["new"].append(time.perf_counter() - start)
+            while not state["terminal"]:
+                board = state["board"]
+                empty = [[i, j] for i in range(3) for j in range(3) if board[i][j] is None]
+                start = time.perf_counter()
+                state = await _request(reader, writer, {
+                    "op": "move", "game": state["game"], "action": rng.choice(empty)
+                })
+                latencies["move"].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            await _request(reader, writer, {"op": "close", "game": state["game"]})
+            latencies["close"].append(time.perf_counter() - start)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run(host="127.0.0.1", port=8483, clients=100, games=10, seed=0):
+    """
+    Runs the clients together and returns a report dictionary.
+    """
+    latencies = {"new": [], "move": [], "close": []}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(host, port, games, random.Random(seed + i), latencies)
+        for i in range(clients)
+    ))
+    elapsed = time.perf_counter() - start
+    requests = sum(len(values) for values in latencies.values())
+    moves = latencies["move"]
+    return {
+        "clients": clients,
+        "games": clients * games,
+        "requests": requests,
+        "moves": len(moves),
+        "seconds": elapsed,
+        "requests_per_second": requests / elapsed,
+        "moves_per_second": len(moves) / elapsed,
+        "latency_ms": {
+            f"p{p}": percentile(moves, p) * 1e3 for p in (50, 90, 99)
+        } | {"max": max(moves, default=0.0) * 1e3},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for the Tic Tac Toe game server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8483)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--games", type=int, default=10, help="games played by each client")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.host, args.port, args.clients, args.games, args.seed))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    latency = report["latency_ms"]
+    print(f"{report['games']} games, {report['requests']} requests in {report['seconds']:.2f}s "
+          f"({report['requests_per_second']:.0f} requests/s, {report['moves_per_second']:.0f} moves/s)")
+    print(f"move latency p50 {latency['p50']:.2f}ms p90 {latency['p90']:.2f}ms "
+          f"p99 {latency['p99']:.2f}ms max {latency['max']:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Monte Carlo Tree Search player
+
+Works with any game object offering player/actions/result/terminal/utility
+on its states, such as mnk.Game, or the tictactoe module itself for list
+boards. If the game has a rollout(state, rng) method it is used for the
+random playouts, otherwise they are played with actions and result.
+"""
+
+import math
+import random
+import time
+
+X = "X"
+
+
+class _Node():
+    """
+    A state of the tree, with the results of the playouts that went
+    through it, counted for the player who moved into it.
+    """
+
+    __slots__ = ("state", "action", "parent", "children", "untried", "visits", "score", "mover")
+
+    def __init__(self, game, state, action=None, parent=None):
+        self.state = state
+        self.action = action
+        self.parent = parent
+        self.children = []
+        self.untried = [] if game.terminal(state) else sorted(game.actions(state))
+        self.visits = 0
+        # 1 for each playout won by the mover, 0.5 for each tie
+        self.score = 0.0
+        self.mover = game.player(parent.state) if parent else None
+
+
+class MCTS():
+    """
+    UCT search: the child maximizing score / visits + c * sqrt(ln N / visits)
+    is followed down to a node with untried actions, one of them is added,
+    and `rollouts` random playouts from it are backed up to the root.
+
+    The tree is kept between calls: when asked about a state reached from
+    the previous root, the matching subtree becomes the new root.
+    """
+
+    def __init__(self, game, budget=1.0, simulations=None, exploration=math.sqrt(2), rollouts=1, seed=None):
+        self.game = game
+        self.budget = budget
+        self.simulations = simulations
+        self.exploration = exploration
+        self.rollouts = rollouts
+        self.rng = random.Random(seed)
+        self.root = None
+
+    def best_move(self, state, budget=None, simulations=None):
+        """
+        Returns the most visited action of state after searching for
+        budget seconds, or for a number of simulations if one is given.
+        Returns None if the game is over.
+        """
+        game = self.game
+        if game.terminal(state):
+            return None
+        budget = self.budget if budget is None else budget
+        simulations = self.simulations if simulations is None else simulations
+
+        root = self._reroot(state)
+        deadline = time.perf_counter() + budget
+        done = 0
+        while True:
+            self._simulate(root)
+            done += 1
+            if simulations is not None:
+                if done >= simulations:
+                    break
+            elif time.perf_counter() > deadline:
+                break
+        return max(root.children, key=lambda child: child.visits).action
+
+    def _reroot(self, state):
+        """
+        Returns the node of state, reusing the tree if the state is the
+        previous root or one or two moves below it.
+        """
+        if self.root is not None:
+            candidates = [self.root]
+            candidates += self.root.children
+            candidates += [grandchild for child in self.root.children for grandchild in child.children]
+            for node in candidates:
+                if node.state == state:
+                    node.parent = None
+                    self.root = node
+                    return node
+        self.root = _Node(self.game, state)
+        return self.root
+
+    def _simulate(self, root):
+        game = self.game
+        node = root
+
+        # Selection
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            node = max(node.children, key=lambda child: (
+                child.score / child.visits
+                + self.exploration * math.sqrt(log_visits / child.visits)
+            ))
+
+        # Expansion
+        if node.untried:
+            action = node.untried.pop(self.rng.randrange(len(node.untried)))
+            child = _Node(game, game.result(node.state, action), action, node)
+            node.children.append(child)
+            node = child
+
+        # Simulation
+        total = 0
+        for _ in range(self.rollouts):
+            total += self._rollout(node.state)
+
+        # Backpropagation, utility being 1 when X wins
+        while node is not None:
+            node.visits += self.rollouts
+            if node.mover is not None:
+                won = total if node.mover == X else -total
+                node.score += (won + self.rollouts) / 2
+            node = node.parent
+
+    def _rollout(self, state):
+        game = self.game
+        if hasattr(game, "rollout"):
+            return game.rollout(state, self.rng)
+        while not game.terminal(state):
+            state = game.result(state, self.rng.choice(sorted(game.actions(state))))
+        return game.utility(state)
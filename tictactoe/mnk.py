@@ -0,0 +1,424 @@
+"""
+m,n,k game: k in a row on a board of m rows and n columns
+
+Tic Tac Toe is the 3,3,3 game, gomoku the 15,15,5 one. A state is a pair
+(x, o) of integers, bit i * n + j being set when the player owns (i, j).
+Boards are too big to search to the end, so the Search class runs an
+iterative deepening alpha-beta within a time budget.
+"""
+
+import math
+import time
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# Score of a won game, reduced by the number of moves needed to win it
+WIN = 1000000
+
+# Kinds of values stored in the transposition table
+EXACT = "exact"
+LOWER = "lower"
+UPPER = "upper"
+
+
+class NotValidAction(Exception):
+    """Raised when action is not possible for the board"""
+    pass
+
+
+class Game():
+    """
+    Rules of the m,n,k game, with the masks of every line of k cells.
+    """
+
+    def __init__(self, m=3, n=3, k=3):
+        if not (0 < k <= max(m, n)):
+            raise ValueError(f"Cannot align {k} cells on a {m}x{n} board")
+        self.m = m
+        self.n = n
+        self.k = k
+        self.size = m * n
+        self.full = (1 << self.size) - 1
+
+        # Every line of k cells, and the lines going through each cell
+        self.lines = []
+        self.lines_through = [[] for _ in range(self.size)]
+        for i in range(m):
+            for j in range(n):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    if not (0 <= i + (k - 1) * di < m and 0 <= j + (k - 1) * dj < n):
+                        continue
+                    cells = [(i + s * di) * n + j + s * dj for s in range(k)]
+                    line = sum(1 << cell for cell in cells)
+                    self.lines.append(line)
+                    for cell in cells:
+                        self.lines_through[cell].append(line)
+
+        # Cells within two rows and columns of each cell
+        self.near = []
+        for i in range(m):
+            for j in range(n):
+                mask = 0
+                for a in range(max(0, i - 2), min(m, i + 3)):
+                    for b in range(max(0, j - 2), min(n, j + 3)):
+                        mask |= 1 << (a * n + b)
+                self.near.append(mask)
+
+    def initial_state(self):
+        """
+        Returns starting state of the board.
+        """
+        return (0, 0)
+
+    def from_board(self, board):
+        """
+        Returns the state of a list of lists board.
+        """
+        x = o = 0
+        for i in range(self.m):
+            for j in range(self.n):
+                if board[i][j] == X:
+                    x |= 1 << (i * self.n + j)
+                elif board[i][j] == O:
+                    o |= 1 << (i * self.n + j)
+        return (x, o)
+
+    def to_board(self, state):
+        """
+        Returns the list of lists board of a state.
+        """
+        x, o = state
+        board = []
+        for i in range(self.m):
+            row = []
+            for j in range(self.n):
+                bit = 1 << (i * self.n + j)
+                row.append(X if x & bit else O if o & bit else EMPTY)
+            board.append(row)
+        return board
+
+    def player(self, state):
+        """
+        Returns player who has the next turn on a board.
+        """
+        x, o = state
+        return X if x.bit_count() == o.bit_count() else O
+
+    def actions(self, state):
+        """
+        Returns set of all possible actions (i, j) available on the board.
+        """
+        empty = self.full ^ (state[0] | state[1])
+        return set(divmod(cell, self.n) for cell in _cells(empty))
+
+    def result(self, state, action):
+        """
+        Returns the board that results from making move (i, j) on the board.
+        """
+        i, j = action
+        cell = i * self.n + j
+        x, o = state
+        if not (0 <= i < self.m and 0 <= j < self.n) or (x | o) >> cell & 1:
+            raise NotValidAction
+        if x.bit_count() == o.bit_count():
+            return (x | 1 << cell, o)
+        return (x, o | 1 << cell)
+
+    def aligned(self, bits):
+        """
+        Returns True if the cells of bits contain k aligned cells.
+        """
+        return any(bits & line == line for line in self.lines)
+
+    def aligned_at(self, bits, cell):
+        """
+        Returns True if the cells of bits contain k aligned cells
+        going through cell.
+        """
+        return any(bits & line == line for line in self.lines_through[cell])
+
+    def winner(self, state):
+        """
+        Returns the winner of the game, if there is one.
+        """
+        if self.aligned(state[0]):
+            return X
+        elif self.aligned(state[1]):
+            return O
+        return None
+
+    def terminal(self, state):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        x, o = state
+        return x | o == self.full or self.aligned(x) or self.aligned(o)
+
+    def utility(self, state):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        if self.aligned(state[0]):
+            return 1
+        elif self.aligned(state[1]):
+            return -1
+        return 0
+
+    def evaluate(self, mine, theirs):
+        """
+        Returns a heuristic score of a position for the owner of `mine`:
+        every line still open to only one player counts for that player,
+        much more as it fills up.
+        """
+        score = 0
+        for line in self.lines:
+            a = mine & line
+            b = theirs & line
+            if a and not b:
+                score += 4 ** a.bit_count()
+            elif b and not a:
+                score -= 4 ** b.bit_count()
+        return score
+
+    def rollout(self, state, rng):
+        """
+        Plays random moves until the game is over and returns its utility.
+        """
+        if self.terminal(state):
+            return self.utility(state)
+        x, o = state
+        cells = list(_cells(self.full ^ (x | o)))
+        rng.shuffle(cells)
+        x_turn = x.bit_count() == o.bit_count()
+        for cell in cells:
+            if x_turn:
+                x |= 1 << cell
+                if self.aligned_at(x, cell):
+                    return 1
+            else:
+                o |= 1 << cell
+                if self.aligned_at(o, cell):
+                    return -1
+            x_turn = not x_turn
+        return 0
+
+    def candidates(self, occupied):
+        """
+        Returns the mask of empty cells worth playing: the ones near an
+        occupied cell, or the center of an empty board.
+        """
+        if not occupied:
+            return 1 << ((self.m // 2) * self.n + self.n // 2)
+        near = 0
+        for cell in _cells(occupied):
+            near |= self.near[cell]
+        return near & ~occupied & self.full
+
+
+def _cells(bits):
+    """
+    Yields the indexes of the set bits, in increasing order.
+    """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class _Timeout(Exception):
+    """Raised inside the search when the time budget is spent"""
+    pass
+
+
+class Search():
+    """
+    Iterative deepening alpha-beta search of an m,n,k game.
+
+    Moves are tried in order: best move from the transposition table,
+    killer moves (moves that caused a cutoff at the same depth), then by
+    history score (how often a move caused cutoffs). The table, killers and
+    history are kept between calls so consecutive turns benefit from them;
+    history is halved at every call and forgotten with the killers when a
+    new game starts.
+
+    The table has `table_size` slots, a position going to the slot of its
+    hash. A position replaces the one in its slot if it was searched at
+    least as deep, or if the other one is from an earlier call.
+    """
+
+    def __init__(self, game, budget=1.0, table_size=1 << 16):
+        self.game = game
+        self.budget = budget
+        self.table = [None] * table_size
+        self.history = [0] * game.size
+        self.killers = []
+        self.nodes = 0
+        self.depth = 0
+        self.deadline = math.inf
+        # number of calls to best_move, and cells taken at the last one
+        self.calls = 0
+        self.taken = 0
+
+    def _lookup(self, key):
+        """
+        Returns the (depth, value, flag, best) entry of a position, or None.
+        """
+        entry = self.table[hash(key) % len(self.table)]
+        if entry is not None and entry[0] == key:
+            return entry[2:]
+        return None
+
+    def _store(self, key, depth, value, flag, best):
+        slot = hash(key) % len(self.table)
+        entry = self.table[slot]
+        if entry is None or entry[0] == key or entry[1] < self.calls or entry[2] <= depth:
+            self.table[slot] = (key, self.calls, depth, value, flag, best)
+
+    def best_move(self, state, budget=None):
+        """
+        Returns the best action (i, j) found for the current player within
+        the budget in seconds, or None if the game is over.
+        """
+        game = self.game
+        if game.terminal(state):
+            return None
+        budget = self.budget if budget is None else budget
+        self.deadline = time.perf_counter() + budget
+        self.nodes = 0
+
+        x, o = state
+        taken = (x | o).bit_count()
+        if taken < self.taken:
+            # a new game: its moves have nothing to do with the last one's
+            self.history = [0] * game.size
+            self.killers = []
+        else:
+            self.history = [h // 2 for h in self.history]
+        self.taken = taken
+        self.calls += 1
+
+        if x.bit_count() == o.bit_count():
+            mine, theirs = x, o
+        else:
+            mine, theirs = o, x
+        moves = list(_cells(game.candidates(x | o)))
+        best = moves[0]
+        empty = (game.full ^ (x | o)).bit_count()
+
+        for depth in range(1, empty + 1):
+            self.depth = depth
+            moves.sort(key=lambda cell: cell != best)
+            alpha = -math.inf
+            found = None
+            try:
+                for cell in moves:
+                    value = -self._negamax(theirs, mine | 1 << cell, cell, depth - 1, -math.inf, -alpha, 1)
+                    if value > alpha:
+                        alpha = value
+                        found = cell
+            except _Timeout:
+                # a move that beat the previous best is still better
+                if found is not None:
+                    best = found
+                break
+            best = found
+            if abs(alpha) >= WIN - game.size:
+                break
+        return divmod(best, game.n)
+
+    def _order(self, cells, ply, hint):
+        while len(self.killers) <= ply:
+            self.killers.append([None, None])
+        killers = self.killers[ply]
+        history = self.history
+
+        def key(cell):
+            if cell == hint:
+                return -math.inf
+            if cell in killers:
+                return -WIN
+            return -history[cell]
+        return sorted(cells, key=key)
+
+    def _negamax(self, mine, theirs, last, depth, alpha, beta, ply):
+        """
+        Returns the value of a position for the owner of `mine`, who is to
+        play, after the opponent played `last`.
+        """
+        game = self.game
+        self.nodes += 1
+        # a node costs far more than reading the clock (evaluate alone
+        # scans every line of the board), so check it at every node
+        if time.perf_counter() > self.deadline:
+            raise _Timeout
+
+        if game.aligned_at(theirs, last):
+            return -(WIN - ply)
+        occupied = mine | theirs
+        if occupied == game.full:
+            return 0
+        if depth == 0:
+            return game.evaluate(mine, theirs)
+
+        key = (mine, theirs)
+        entry = self._lookup(key)
+        hint = None
+        if entry is not None:
+            entry_depth, value, flag, hint = entry
+            if entry_depth >= depth:
+                value = _from_table(value, ply)
+                if flag == EXACT:
+                    return value
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+        window = (alpha, beta)
+
+        best_value = -math.inf
+        best = None
+        for cell in self._order(_cells(game.candidates(occupied)), ply, hint):
+            value = -self._negamax(theirs, mine | 1 << cell, cell, depth - 1, -beta, -alpha, ply + 1)
+            if value > best_value:
+                best_value = value
+                best = cell
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                killers = self.killers[ply]
+                if cell != killers[0]:
+                    killers[1] = killers[0]
+                    killers[0] = cell
+                self.history[cell] += depth * depth
+                break
+
+        if best_value <= window[0]:
+            flag = UPPER
+        elif best_value >= window[1]:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self._store(key, depth, _to_table(best_value, ply), flag, best)
+        return best_value
+
+
+def _to_table(value, ply):
+    """
+    Won and lost scores depend on the ply, store them relative to the node.
+    """
+    if value >= WIN - 10000:
+        return value + ply
+    if value <= -WIN + 10000:
+        return value - ply
+    return value
+
+
+def _from_table(value, ply):
+    if value >= WIN - 10000:
+        return value - ply
+    if value <= -WIN + 10000:
+        return value + ply
+    return value
@@ -0,0 +1,162 @@
+"""
+Parallel minimax for Tic Tac Toe
+
+The root actions of a board are searched in a pool of processes. Each
+action is searched with the best value already known for the actions before
+it, and actions after one reaching the best possible value are aborted:
+the workers poll a control array shared with the pool, and stop searching
+a move that has become useless, or that belongs to an earlier call.
+Ties are broken like the serial minimax (first action in move order), so
+both always return the same action.
+"""
+
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import bitboard
+import tictactoe as ttt
+
+# Pools by number of workers, kept alive between calls
+_pools = {}
+# By number of workers: the control array shared with the workers of the
+# pool, [id of the running call, index of its first useless move], and the
+# lock that lets one call at a time use it
+_controls = {}
+_locks = {}
+_calls = itertools.count(1)
+
+# Control array of the pool, in a worker
+_control = None
+
+
+def get_pool(workers=None):
+    """
+    Returns the pool of `workers` processes (one per core by default).
+    """
+    workers = workers or os.cpu_count()
+    if workers not in _pools:
+        control = multiprocessing.Array("q", 2, lock=False)
+        _pools[workers] = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(control,))
+        _controls[workers] = control
+        _locks[workers] = threading.Lock()
+    return _pools[workers]
+
+
+def shutdown():
+    """
+    Stops every pool.
+    """
+    for workers, pool in _pools.items():
+        # running searches stop at their next node
+        _controls[workers][0] = 0
+        pool.shutdown(cancel_futures=True)
+    _pools.clear()
+    _controls.clear()
+    _locks.clear()
+
+
+def _init_worker(control):
+    global _control
+    _control = control
+
+
+def _score(state, cell, alpha, beta, call, index, collect=False):
+    """
+    Returns (value, stats) for playing cell, searched in a worker, or None
+    if the search was aborted. stats is a SearchStats of the search if
+    collect is True, None otherwise.
+    """
+    def stop():
+        return _control[0] != call or _control[1] <= index
+
+    stats = ttt.SearchStats() if collect else None
+    game = bitboard.GameState(state)
+    ttt._stats = stats
+    ttt._root_count = game.count
+    ttt._should_stop = stop
+    start = time.perf_counter()
+    game.make(cell)
+    try:
+        value = ttt._rec_minimax(game, alpha, beta, game.player() == ttt.X)
+    except ttt._Aborted:
+        return None
+    finally:
+        ttt._should_stop = None
+        ttt._stats = None
+    if stats is not None:
+        stats.root_times[divmod(cell, 3)] = time.perf_counter() - start
+    return value, stats
+
+
+def minimax(board, workers=None, stats=None):
+    """
+    Returns the optimal action for the current player on a 3x3 board,
+    searching the root actions in parallel.
+
+    If stats is a SearchStats, the counters of the searches of the root
+    actions that were not aborted are added to it.
+    """
+    state = bitboard.from_board(board)
+    if bitboard.terminal(state):
+        return None
+    workers = workers or os.cpu_count()
+    pool = get_pool(workers)
+    with _locks[workers]:
+        return _minimax(state, pool, workers, _controls[workers], stats)
+
+
+def _minimax(state, pool, workers, control, stats=None):
+    """
+    Returns the optimal action for a state not over, with the pool and
+    control array of `workers` processes.
+    """
+    maximize = bitboard.player(state) == ttt.X
+    best_possible = 1 if maximize else -1
+    moves = bitboard.moves(state)
+    values = [None] * len(moves)
+    pending = {}
+    submitted = 0
+    # moves from this index on cannot be chosen any more
+    useless = len(moves)
+    call = next(_calls)
+    control[1] = useless
+    control[0] = call
+
+    while submitted < useless or pending:
+        while submitted < useless and len(pending) < workers:
+            # bound known from the moves before: doing as well is not enough
+            known = [v for v in values[:submitted] if v is not None]
+            if maximize:
+                window = (max(known, default=-math.inf), math.inf)
+            else:
+                window = (-math.inf, min(known, default=math.inf))
+            future = pool.submit(
+                _score, state, moves[submitted], *window, call, submitted, stats is not None
+            )
+            pending[future] = submitted
+            submitted += 1
+
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            index = pending.pop(future)
+            values[index], searched = future.result()
+            if stats is not None:
+                stats.add(searched)
+            if values[index] == best_possible and index < useless:
+                useless = index + 1
+                # the workers searching the moves after it stop
+                control[1] = useless
+        for future, index in list(pending.items()):
+            if index >= useless:
+                del pending[future]
+
+    best = None
+    for index, value in enumerate(values[:useless]):
+        if best is None or (value > values[best] if maximize else value < values[best]):
+            best = index
+    return divmod(moves[best], 3)
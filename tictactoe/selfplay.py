@@ -0,0 +1,121 @@
+"""
+Headless self-play of the Tic Tac Toe AI
+
+Plays games of minimax against itself and against a random player, and
+reports throughput, nodes per second and the latency of minimax calls.
+
+Usage: python selfplay.py [--games N] [--seed S] [--no-book] [--cold] [--json]
+"""
+
+import argparse
+import json
+import math
+import random
+import time
+
+import tictactoe as ttt
+
+
+def percentile(values, p):
+    """
+    Returns the p-th percentile (0 to 100) of values, by nearest rank:
+    the smallest value with at least p% of the values at or below it.
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    # p * n / 100 rather than p / 100 * n, which can land just above an
+    # integer (7 / 100 * 100 is 7.000000000000001)
+    rank = max(0, min(len(values) - 1, math.ceil(p * len(values) / 100) - 1))
+    return values[rank]
+
+
+def play(players, rng, use_book=True, latencies=None, stats=None):
+    """
+    Plays one game where players maps X and O to "ai" or "random".
+    Returns the winner, or None for a tie.
+    """
+    board = ttt.initial_state()
+    while not ttt.terminal(board):
+        if players[ttt.player(board)] == "ai":
+            start = time.perf_counter()
+            action = ttt.minimax(board, use_book=use_book, stats=stats)
+            if latencies is not None:
+                latencies.append(time.perf_counter() - start)
+        else:
+            action = rng.choice(sorted(ttt.actions(board)))
+        board = ttt.result(board, action)
+    return ttt.winner(board)
+
+
+def run(games=1000, seed=0, use_book=True, cold=False):
+    """
+    Plays `games` games of each match-up and returns a report dictionary.
+    With cold=True, the transposition table is emptied before every game.
+    """
+    rng = random.Random(seed)
+    matchups = {
+        "ai-vs-ai": {ttt.X: "ai", ttt.O: "ai"},
+        "ai-vs-random": {ttt.X: "ai", ttt.O: "random"},
+        "random-vs-ai": {ttt.X: "random", ttt.O: "ai"},
+    }
+    report = {"games": games, "seed": seed, "book": use_book, "cold": cold, "matchups": {}}
+
+    for name, players in matchups.items():
+        latencies = []
+        outcomes = {ttt.X: 0, ttt.O: 0, "tie": 0}
+        stats = ttt.SearchStats()
+        start = time.perf_counter()
+        for _ in range(games):
+            if cold:
+                ttt.table.clear()
+            winner = play(players, rng, use_book, latencies, stats)
+            outcomes[winner or "tie"] += 1
+        elapsed = time.perf_counter() - start
+        search_time = sum(latencies)
+
+        report["matchups"][name] = {
+            "outcomes": outcomes,
+            "ai_losses": sum(
+                count for player, count in outcomes.items()
+                if player in players and players[player] == "random"
+            ),
+            "games_per_second": games / elapsed,
+            "minimax_calls": len(latencies),
+            "nodes": stats.nodes,
+            "nodes_per_second": stats.nodes / search_time if search_time else 0.0,
+            "cutoffs": stats.alpha_cutoffs + stats.beta_cutoffs,
+            "cache_hits": stats.cache_hits,
+            "book_hits": stats.book_hits,
+            "latency_us": {
+                f"p{p}": percentile(latencies, p) * 1e6 for p in (50, 90, 99)
+            } | {"max": max(latencies, default=0.0) * 1e6},
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-book", action="store_true", help="search every move")
+    parser.add_argument("--cold", action="store_true", help="empty the table before each game")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.games, args.seed, not args.no_book, args.cold)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for name, stats in report["matchups"].items():
+        latency = stats["latency_us"]
+        print(f"{name}: {stats['outcomes']}, AI losses {stats['ai_losses']}")
+        print(f"    {stats['games_per_second']:.0f} games/s, "
+              f"{stats['nodes']} nodes, {stats['nodes_per_second']:.0f} nodes/s")
+        print(f"    minimax latency p50 {latency['p50']:.1f}us p90 {latency['p90']:.1f}us "
+              f"p99 {latency['p99']:.1f}us max {latency['max']:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
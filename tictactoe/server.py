@@ -0,0 +1,205 @@
+"""
+Tic Tac Toe game server
+
+Hosts many games at once over TCP. Each request and response is one JSON
+object per line:
+    {"op": "new", "player": "X"}           starts a game, the user plays X or O
+    {"op": "move", "game": 1, "action": [i, j]}
+                                            plays for the user, then for the AI
+    {"op": "close", "game": 1}             forgets a game
+Every response holds the game id, the board, the last AI action, the
+winner and whether the game is over, or an "error" message.
+
+A connection only sees the games it started, and they are forgotten when
+it is closed.
+
+AI moves are computed in an executor so the event loop never waits for
+them, and answers are cached for every game to share.
+
+Usage: python server.py [--host HOST] [--port PORT] [--workers N] [--processes]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import tictactoe as ttt
+
+
+class MoveCache():
+    """
+    Least recently used cache of AI actions by board.
+    """
+
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        action = self.entries.get(key)
+        if action is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return action
+
+    def store(self, key, action):
+        self.entries[key] = action
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class GameServer():
+    """
+    Games of every connection, and the executor the AI runs in.
+    """
+
+    def __init__(self, executor, cache=None):
+        self.executor = executor
+        self.cache = cache or MoveCache()
+        self.games = {}
+        self.ids = itertools.count(1)
+
+    async def ai_move(self, board):
+        """
+        Returns the AI action for board, from the cache or the executor.
+        """
+        key = tuple(tuple(row) for row in board)
+        action = self.cache.get(key)
+        if action is None:
+            loop = asyncio.get_running_loop()
+            action = await loop.run_in_executor(self.executor, ttt.minimax, board)
+            self.cache.store(key, action)
+        return action
+
+    def _state(self, game_id, ai_action=None):
+        board = self.games[game_id]["board"]
+        return {
+            "game": game_id,
+            "board": board,
+            "ai_action": ai_action,
+            "winner": ttt.winner(board),
+            "terminal": ttt.terminal(board),
+        }
+
+    async def handle(self, request, owned):
+        """
+        Returns the response to one request of a connection, `owned` being
+        the set of the ids of the games the connection started.
+        """
+        op = request.get("op")
+        if op == "new":
+            user = request.get("player", ttt.X)
+            if user not in (ttt.X, ttt.O):
+                return {"error": f"Unknown player: {user}"}
+            game_id = next(self.ids)
+            board = ttt.initial_state()
+            self.games[game_id] = {"board": board, "user": user}
+            owned.add(game_id)
+            ai_action = None
+            if user == ttt.O:
+                ai_action = await self.ai_move(board)
+                self.games[game_id]["board"] = ttt.result(board, ai_action)
+            return self._state(game_id, ai_action)
+
+        game_id = request.get("game")
+        if not _is_int(game_id) or game_id not in owned:
+            return {"error": f"Unknown game: {game_id}"}
+
+        if op == "close":
+            del self.games[game_id]
+            owned.discard(game_id)
+            return {"game": game_id, "closed": True}
+
+        if op == "move":
+            game = self.games[game_id]
+            board = game["board"]
+            if ttt.terminal(board):
+                return {"error": "Game is over"}
+            if ttt.player(board) != game["user"]:
+                return {"error": "Not your turn"}
+            action = request.get("action")
+            if not (isinstance(action, list) and len(action) == 2 and all(map(_is_int, action))):
+                return {"error": f"Invalid action: {action}"}
+            try:
+                board = ttt.result(board, tuple(action))
+            except ttt.NotValidAction:
+                return {"error": f"Invalid action: {action}"}
+            ai_action = None
+            if not ttt.terminal(board):
+                ai_action = await self.ai_move(board)
+                board = ttt.result(board, ai_action)
+            game["board"] = board
+            return self._state(game_id, ai_action)
+
+        return {"error": f"Unknown op: {op}"}
+
+    async def serve_client(self, reader, writer):
+        """
+        Answers the requests of one connection until it is closed, then
+        forgets its games.
+        """
+        owned = set()
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    response = await self.handle(request, owned)
+                except (json.JSONDecodeError, AttributeError):
+                    response = {"error": "Invalid request"}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for game_id in owned:
+                self.games.pop(game_id, None)
+            writer.close()
+
+
+async def serve(host="127.0.0.1", port=8483, workers=1, processes=False):
+    """
+    Runs the server until it is cancelled.
+    """
+    if processes:
+        executor = ProcessPoolExecutor(workers)
+    else:
+        # minimax shares its tables between threads, one thread is enough
+        # as the search holds the GIL anyway
+        executor = ThreadPoolExecutor(workers)
+    game_server = GameServer(executor)
+    server = await asyncio.start_server(game_server.serve_client, host, port, limit=2 ** 16)
+    print(f"Serving on {host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tic Tac Toe game server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8483)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--processes", action="store_true", help="run the AI in processes instead of threads")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.processes))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -3,22 +3,32 @@ Tic Tac Toe Player
 """
 
 import math
+import time
+from collections import OrderedDict
+
+import bitboard
+import book
+import mcts as mcts_engine
+import mnk
+from bitboard import NotValidAction
 
 X = "X"
 O = "O"
 EMPTY = None
 
-class NotValidAction(Exception):
-    """Raised when action is not possible for the board"""
-    pass
+# Number of aligned cells needed to win
+K = 3
+
+# Kinds of values stored in the transposition table
+EXACT = "exact"
+LOWER = "lower"
+UPPER = "upper"
 
-def initial_state():
+def initial_state(m=3, n=3):
     """
-    Returns starting state of the board.
+    Returns starting state of a board of m rows and n columns.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * n for _ in range(m)]
 
 def _count(board, symbol):
     """
@@ -41,7 +51,7 @@ def actions(board):
     """
     res = set()
     for i in range(len(board)):
-        for j in range(len(board)):
+        for j in range(len(board[i])):
             if not board[i][j]:
                 res.add((i,j))
     return res
@@ -57,111 +67,411 @@ def result(board, action):
     #deep copy
     res = [row[:] for row in board]
 
-    #between 0 and len(board) too ?
-    if board[i][j]:  
+    if not (0 <= i < len(board) and 0 <= j < len(board[i])) or board[i][j]:
         raise NotValidAction
     
     res[i][j]=player(board)
     return res
 
-def _aligned(board, symbol):
+def _aligned(board, symbol, k=K):
     """
-    Returns True is there are 3 of the chosen symbol aligned on the board.
+    Returns True is there are k of the chosen symbol aligned on the board.
     """
-    diagonal1 = True
-    diagonal2= True
-    for i in range(len(board)):
-        if board[i][i] != symbol:
-            diagonal1 = False
-        if board[i][2-i] != symbol:
-                diagonal2 = False
+    m = len(board)
+    n = len(board[0])
+    for i in range(m):
+        for j in range(n):
+            if board[i][j] != symbol:
+                continue
+            #lines starting at (i, j): horizontal, vertical and both diagonals
+            for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                if not (0 <= i + (k-1)*di < m and 0 <= j + (k-1)*dj < n):
+                    continue
+                if all(board[i + s*di][j + s*dj] == symbol for s in range(1, k)):
+                    return True
+    return False
 
-    if diagonal1 or diagonal2:
-        return True
-    else :
-        for i in range(len(board)):
-            horizontal = True
-            vertical = True
-            for j in range(len(board)):
-                if board[i][j] != symbol:
-                    vertical = False
-                if board[j][i] != symbol:
-                    horizontal = False
-            if vertical or horizontal:
-                return True
-        return False
-
-def winner(board):
+def winner(board, k=K):
     """
     Returns the winner of the game, if there is one.
     """
-    if _aligned(board, X):
+    if _aligned(board, X, k):
         return X 
-    elif _aligned(board, O):
+    elif _aligned(board, O, k):
         return O
     return None 
 
 
-def terminal(board):
+def terminal(board, k=K):
     """
     Returns True if game is over, False otherwise.
     """
-    if winner(board) or _count(board, EMPTY) == 0:
+    if winner(board, k) or _count(board, EMPTY) == 0:
         return True
     return False
 
 
-def utility(board):
+def utility(board, k=K):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    if _aligned(board, X):
+    if _aligned(board, X, k):
         return 1
-    elif _aligned(board, O):
+    elif _aligned(board, O, k):
         return -1
     else:
         return 0
 
-def _rec_minimax(board, alpha, beta, myTurn):
+def _symmetries(size):
+    """
+    Returns the 8 rotations and reflections of a size x size board,
+    each one as the list of cells read in place of (0, 0), (0, 1), ...
     """
-    Returns a dictionnary containing the score for a given board,
-    by using reccurence to evaluate the outcome of the action in the tree
+    last = size - 1
+    transforms = [
+        lambda i, j: (i, j),
+        lambda i, j: (j, last - i),
+        lambda i, j: (last - i, last - j),
+        lambda i, j: (last - j, i),
+        lambda i, j: (i, last - j),
+        lambda i, j: (last - i, j),
+        lambda i, j: (j, i),
+        lambda i, j: (last - j, last - i),
+    ]
+    cells = [(i, j) for i in range(size) for j in range(size)]
+    return [[transform(i, j) for i, j in cells] for transform in transforms]
+
+_SYMMETRIES = _symmetries(3)
+
+def _permuted(symmetry):
+    """
+    Returns, for every 9-bit set of cells, the same set once transformed.
+    """
+    table = []
+    for bits in range(bitboard.FULL + 1):
+        res = 0
+        for cell, (i, j) in enumerate(symmetry):
+            if bits >> (i * 3 + j) & 1:
+                res |= 1 << cell
+        table.append(res)
+    return table
+
+_PERMUTED = [_permuted(symmetry) for symmetry in _SYMMETRIES]
+
+def _canonical(x, o):
+    """
+    Returns a key that is the same for a state and all its symmetric states.
+    """
+    return min(permuted[x] << 9 | permuted[o] for permuted in _PERMUTED)
+
+
+class TranspositionTable():
     """
-    if terminal(board):
-        return utility(board)
+    Cache of the values of already searched boards.
+
+    Each entry is a (value, flag) pair where flag tells if the value is
+    EXACT, or only a LOWER or UPPER bound because of an alpha-beta cutoff.
+    When max_size is reached, an entry is evicted following the policy:
+        "lru"  : the least recently used entry
+        "fifo" : the oldest stored entry
+    """
+
+    POLICIES = ("lru", "fifo")
+
+    def __init__(self, max_size=None, policy="lru"):
+        if policy not in TranspositionTable.POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.max_size = max_size
+        self.policy = policy
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        Returns the (value, flag) entry of key, or None if not cached.
+        """
+        entry = self.entries.get(key)
+        if entry is not None and self.policy == "lru":
+            self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key, value, flag):
+        """
+        Adds or replaces the entry of key, evicting one if the table is full.
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+        elif self.max_size is not None and len(self.entries) >= self.max_size:
+            self.entries.popitem(last=False)
+        self.entries[key] = (value, flag)
+
+    def clear(self):
+        self.entries.clear()
+
+# Shared by every call to minimax, so work is reused between turns and games
+table = TranspositionTable()
+
+def configure_table(max_size=None, policy="lru"):
+    """
+    Replaces the shared transposition table by an empty one.
+    """
+    global table
+    table = TranspositionTable(max_size, policy)
+    return table
+
+
+class SearchStats():
+    """
+    Counters of what a search did, filled when given to minimax.
+
+    The same object can be given to several calls to add their counts up.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.nodes = 0
+        self.beta_cutoffs = 0
+        self.alpha_cutoffs = 0
+        self.cache_hits = 0
+        self.book_hits = 0
+        self.max_depth = 0
+        # seconds spent searching each root action (i, j)
+        self.root_times = {}
+
+    def add(self, other):
+        """
+        Adds the counts of another SearchStats, such as one filled in a
+        worker process.
+        """
+        for name in ("calls", "nodes", "beta_cutoffs", "alpha_cutoffs", "cache_hits", "book_hits"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.max_depth = max(self.max_depth, other.max_depth)
+        for action, elapsed in other.root_times.items():
+            self.root_times[action] = self.root_times.get(action, 0.0) + elapsed
+
+    def as_dict(self):
+        """
+        Returns the counters as a dictionary that can be dumped to JSON.
+        """
+        res = dict(self.__dict__)
+        res["root_times"] = {f"{i},{j}": t for (i, j), t in self.root_times.items()}
+        return res
+
+# Collector of the running search, None when stats are not wanted
+_stats = None
+# Number of cells taken on the searched board, to know the depth of a node
+_root_count = 0
+# Function polled at every node, the search stops when it returns True;
+# None when the search always runs to the end
+_should_stop = None
+
+class _Aborted(Exception):
+    """Raised inside the search when _should_stop returns True"""
+    pass
+
+def _rec_minimax(game, alpha, beta, myTurn):
+    """
+    Returns a dictionnary containing the score for a given GameState,
+    by using reccurence to evaluate the outcome of the action in the tree.
+    Moves are made and undone on game, so it is left as it was given.
+    """
+    if _stats is not None:
+        _stats.nodes += 1
+        _stats.max_depth = max(_stats.max_depth, game.count - _root_count)
+    if _should_stop is not None and _should_stop():
+        raise _Aborted
+    if game.terminal():
+        return game.utility()
+
+    #values are always seen from X, so symmetric boards share an entry
+    key = _canonical(game.x, game.o)
+    entry = table.get(key)
+    if entry is not None:
+        value, flag = entry
+        if flag == EXACT:
+            if _stats is not None:
+                _stats.cache_hits += 1
+            return value
+        if flag == LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            if _stats is not None:
+                _stats.cache_hits += 1
+            return value
+    window = (alpha, beta)
 
     if myTurn:
         maxEva = -math.inf
-        for action in actions(board):
-            eva = _rec_minimax(result(board, action), alpha, beta, False)
+        for cell in game.moves():
+            game.make(cell)
+            eva = _rec_minimax(game, alpha, beta, False)
+            game.undo(cell)
             maxEva = max(maxEva, eva)
             alpha = max(alpha, maxEva)
             if maxEva >= beta:
+                if _stats is not None:
+                    _stats.beta_cutoffs += 1
                 break
-        return maxEva
+        value = maxEva
 
     else:
         minEva = math.inf
-        for action in actions(board):
-            eva = _rec_minimax(result(board, action), alpha, beta, True)
+        for cell in game.moves():
+            game.make(cell)
+            eva = _rec_minimax(game, alpha, beta, True)
+            game.undo(cell)
             minEva = min(minEva, eva)
             beta = min(beta, minEva)
             if minEva <= alpha:
+                if _stats is not None:
+                    _stats.alpha_cutoffs += 1
                 break
-        return minEva
+        value = minEva
+
+    if value <= window[0]:
+        table.store(key, value, UPPER)
+    elif value >= window[1]:
+        table.store(key, value, LOWER)
+    else:
+        table.store(key, value, EXACT)
+    return value
+
+# Solved positions, built by `python book.py`; None if the file is missing
+opening_book = book.load()
 
-def minimax(board):
+# Searches of larger games by (m, n, k), kept to reuse their tables
+_searches = {}
+# Monte Carlo trees by (m, n, k), kept to reuse them on the next turn
+_trees = {}
+
+def minimax(board, use_book=True, k=K, budget=1.0, workers=None, stats=None):
     """
     Returns the optimal action for the current player on the board.
+    The move is read from the opening book when there is one, otherwise
+    (or with use_book=False) it is found by search, split between
+    `workers` processes when given.
+
+    Boards other than 3x3 with k=3 cannot be fully searched: the best
+    action found within budget seconds is returned instead. There is no
+    book for them, and they cannot be split between workers.
+
+    If stats is a SearchStats, the counters of the search are added to it.
+    The time budgeted search only counts calls, nodes and the depth it
+    reached; with workers, only the searches of root actions that were
+    not aborted are counted.
     """
-    if terminal(board):
+    m = len(board)
+    n = len(board[0])
+    if (m, n, k) != (3, 3, 3):
+        if workers:
+            raise ValueError(f"Only 3x3 boards with k=3 can be searched by workers, not {m}x{n} with k={k}")
+        if (m, n, k) not in _searches:
+            _searches[m, n, k] = mnk.Search(mnk.Game(m, n, k))
+        search = _searches[m, n, k]
+        action = search.best_move(search.game.from_board(board), budget)
+        if stats is not None and action is not None:
+            stats.calls += 1
+            stats.nodes += search.nodes
+            stats.max_depth = max(stats.max_depth, search.depth)
+        return action
+
+    state = bitboard.from_board(board)
+    if bitboard.terminal(state):
         return None
-    else:
+    if stats is not None:
+        stats.calls += 1
+    if use_book and opening_book is not None:
+        entry = book.lookup(opening_book, state)
+        if entry is not None:
+            if stats is not None:
+                stats.book_hits += 1
+            return divmod(entry[0], 3)
+    if workers:
+        import parallel
+        return parallel.minimax(board, workers, stats)
+
+    return divmod(_search_root(state, stats)[0], 3)
+
+def _search_root(state, stats=None):
+    """
+    Returns the best cell of a non terminal state and its value.
+    """
+    global _stats, _root_count
+    game = bitboard.GameState(state)
+    _stats = stats
+    _root_count = game.count
+    try:
+        turn = game.player()
         scores = {}
-        for action in actions(board):
-            scores[action] = _rec_minimax(result(board, action), -math.inf, math.inf, player(board) != X)
-        if player(board) == X:
-            return max(scores.keys(), key=(lambda new_k: scores[new_k]))
-        return min(scores.keys(), key=(lambda new_k: scores[new_k]))
+        for cell in game.moves():
+            start = time.perf_counter()
+            game.make(cell)
+            scores[cell] = _rec_minimax(game, -math.inf, math.inf, turn != X)
+            game.undo(cell)
+            if stats is not None:
+                action = divmod(cell, 3)
+                elapsed = time.perf_counter() - start
+                stats.root_times[action] = stats.root_times.get(action, 0.0) + elapsed
+    finally:
+        _stats = None
+
+    if turn == X:
+        best = max(scores.keys(), key=(lambda new_k: scores[new_k]))
+    else:
+        best = min(scores.keys(), key=(lambda new_k: scores[new_k]))
+    return best, scores[best]
+
+def analyse(boards, use_book=True):
+    """
+    Returns, for each 3x3 board, a (action, value, nodes) triple: the
+    optimal action (None if the game is over), the value of the board for X
+    and the number of boards searched to find them.
+
+    Boards of the batch share the transposition table, and a board seen
+    twice is only analysed once.
+    """
+    results = []
+    done = {}
+    for board in boards:
+        state = bitboard.from_board(board)
+        if state in done:
+            action, value, _ = done[state]
+            results.append((action, value, 0))
+            continue
+
+        stats = SearchStats()
+        entry = None
+        if bitboard.terminal(state):
+            entry = (None, bitboard.utility(state))
+        elif use_book and opening_book is not None:
+            entry = book.lookup(opening_book, state)
+        if entry is None:
+            entry = _search_root(state, stats)
+        cell, value = entry
+        action = None if cell is None else divmod(cell, 3)
+        done[state] = (action, value, stats.nodes)
+        results.append(done[state])
+    return results
 
+def mcts(board, k=K, budget=1.0, simulations=None):
+    """
+    Returns an action for the current player on the board, chosen by
+    Monte Carlo Tree Search within budget seconds, or after a number of
+    simulations if one is given.
+    """
+    m = len(board)
+    n = len(board[0])
+    if (m, n, k) not in _trees:
+        _trees[m, n, k] = mcts_engine.MCTS(mnk.Game(m, n, k))
+    tree = _trees[m, n, k]
+    return tree.best_move(tree.game.from_board(board), budget, simulations)
 
+# AI players that can be chosen, all called as engine(board)
+ENGINES = {
+    "minimax": minimax,
+    "mcts": mcts,
+}